@@ -1,15 +1,23 @@
 import os
 from flask import Flask
-from flask_jwt_extended import JWTManager
+from .auth import JWTManager
 from .config import Config
+from .json_provider import FastJSONProvider
 from .routes import api_bp
+from . import compression, database, metrics, migrations, response_cache
 
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config())
     app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", app.config["JWT_SECRET_KEY"])
     JWTManager(app)
+    database.init_app(app)
+    migrations.init_app(app)
+    metrics.init_app(app)
+    compression.init_app(app)
+    response_cache.init_app(app)
     app.register_blueprint(api_bp, url_prefix="/api")
     return app
 
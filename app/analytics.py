@@ -0,0 +1,96 @@
+import math
+from typing import Any, Dict, List, Optional
+from .cache import TTLCache
+from .config import Config
+from .database import get_cursor
+from .query import character_where, table_versions
+
+
+STAT_NAMES = ("strength", "intelligence", "dexterity", "stamina", "faith", "agility")
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+STATS_FROM = " FROM characters c JOIN stats s ON c.stat_id = s.id"
+
+summaries = TTLCache(Config.CACHE_MAXSIZE, Config.ANALYTICS_CACHE_TTL)
+
+
+def versioned(kind: str, filters: Dict[str, Any], extra: tuple, compute):
+    # Whole results are memoised per characters/stats version. This is invalidation, not incremental
+    # refresh: any write to either table reruns the full GROUP BY on the next call.
+    versions = table_versions(("characters", "stats"))
+    key = (kind, tuple(sorted(filters.items())), extra)
+    hit, entry = summaries.get(key)
+    if hit and entry[0] == versions:
+        return entry[1]
+    result = compute()
+    summaries.set(key, (versions, result))
+    return result
+
+
+def frequency_query(filters: Dict[str, Any]) -> (str, List[Any]):
+    where, params = character_where(filters, stats_joined=True)
+    parts = [f"SELECT '{stat}' AS stat, s.{stat} AS value, COUNT(*) AS n{STATS_FROM}{where} GROUP BY s.{stat}" for stat in STAT_NAMES]
+    return " UNION ALL ".join(parts), params * len(STAT_NAMES)
+
+
+def distribution(frequencies: Dict[int, int], bucket: int) -> Optional[Dict[str, Any]]:
+    count = sum(frequencies.values())
+    if not count:
+        return None
+    values = sorted(frequencies)
+    mean = sum(value * n for value, n in frequencies.items()) / count
+    variance = sum(n * (value - mean) ** 2 for value, n in frequencies.items()) / count
+    percentiles = {}
+    seen = 0
+    targets = iter(PERCENTILES)
+    target = next(targets)
+    for value in values:
+        seen += frequencies[value]
+        while target is not None and seen >= math.ceil(target / 100 * count):
+            percentiles[f"p{target}"] = value
+            target = next(targets, None)
+    histogram = {}
+    for value in values:
+        start = value // bucket * bucket
+        histogram[start] = histogram.get(start, 0) + frequencies[value]
+    return {
+        "min": values[0],
+        "max": values[-1],
+        "mean": round(mean, 2),
+        "stddev": round(math.sqrt(variance), 2),
+        "percentiles": percentiles,
+        "histogram": [{"from": start, "to": start + bucket - 1, "count": n} for start, n in histogram.items()],
+    }
+
+
+def stat_summary(filters: Dict[str, Any], bucket: int) -> Dict[str, Any]:
+    def compute():
+        frequencies = {stat: {} for stat in STAT_NAMES}
+        query, params = frequency_query(filters)
+        with get_cursor(read=True) as (conn, cursor):
+            cursor.execute(query, tuple(params))
+            for row in cursor.fetchall():
+                frequencies[row["stat"]][row["value"]] = row["n"]
+        return {
+            "count": sum(frequencies[STAT_NAMES[0]].values()),
+            "stats": {stat: distribution(frequencies[stat], bucket) for stat in STAT_NAMES},
+        }
+    return versioned("summary", filters, (bucket,), compute)
+
+
+def class_breakdown(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def compute():
+        where, params = character_where(filters, stats_joined=True)
+        columns = ", ".join(f"AVG(s.{stat}) AS {stat}_avg, MIN(s.{stat}) AS {stat}_min, MAX(s.{stat}) AS {stat}_max" for stat in STAT_NAMES)
+        query = f"SELECT c.class_id, COUNT(*) AS characters, {columns}{STATS_FROM}{where} GROUP BY c.class_id ORDER BY c.class_id"
+        with get_cursor(read=True) as (conn, cursor):
+            cursor.execute(query, tuple(params))
+            rows = cursor.fetchall()
+        return [
+            {
+                "class_id": row["class_id"],
+                "characters": row["characters"],
+                **{stat: {"avg": round(float(row[f"{stat}_avg"]), 2), "min": row[f"{stat}_min"], "max": row[f"{stat}_max"]} for stat in STAT_NAMES},
+            }
+            for row in rows
+        ]
+    return versioned("by_class", filters, (), compute)
@@ -0,0 +1,172 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from flask import request
+from flask_jwt_extended import verify_jwt_in_request
+from werkzeug.exceptions import HTTPException
+from . import async_database, create_app
+from .async_routes import ASYNC_VIEWS, AsyncStream
+from .compression import acompress_stream, stream_codec
+from .config import Config
+
+
+def build_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        if key in environ:
+            # HTTP/2 sends each cookie as its own field; they are rejoined with "; " (RFC 9113 8.2.3).
+            value = environ[key] + ("; " if key == "HTTP_COOKIE" else ",") + value
+        environ[key] = value
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+def run_wsgi(app, environ):
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = headers
+
+    result = app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return started["status"], started["headers"], body
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def encode_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+class ASGIApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(Config.ASGI_WSGI_THREADS, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        environ = build_environ(scope, await read_body(receive))
+        view = self.match(environ)
+        if view is not None:
+            await self.dispatch(view, environ, send)
+            return
+        loop = asyncio.get_running_loop()
+        status, headers, body = await loop.run_in_executor(self.executor, run_wsgi, self.flask_app, environ)
+        await send({"type": "http.response.start", "status": status, "headers": encode_headers(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await async_database.close_pool()
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def match(self, environ):
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            return None
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        return ASYNC_VIEWS.get(endpoint)
+
+    async def handle(self, view):
+        app = self.flask_app
+        try:
+            result = app.preprocess_request()
+            if result is None:
+                verify_jwt_in_request()
+                result = await view(**request.view_args)
+        except Exception as exc:
+            result = app.handle_user_exception(exc)
+        return result
+
+    async def dispatch(self, view, environ, send):
+        app = self.flask_app
+        ctx = app.request_context(environ)
+        ctx.push()
+        error = None
+        try:
+            try:
+                result = await self.handle(view)
+            except Exception as exc:
+                error = exc
+                result = app.handle_exception(exc)
+            body = None
+            if isinstance(result, AsyncStream):
+                response = result.response
+                codec = stream_codec(response)
+                body = acompress_stream(codec, result.body) if codec else result.body
+            else:
+                response = app.make_response(result)
+            response = app.process_response(response)
+            await send({"type": "http.response.start", "status": response.status_code, "headers": encode_headers(response.headers.items())})
+            if environ["REQUEST_METHOD"] == "HEAD":
+                if body is not None:
+                    await body.aclose()
+                await send({"type": "http.response.body", "body": b""})
+            elif body is None:
+                await send({"type": "http.response.body", "body": response.get_data()})
+            else:
+                try:
+                    async for chunk in body:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                finally:
+                    await body.aclose()
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            ctx.pop(error)
+
+
+def create_asgi_app():
+    return ASGIApp(create_app())
+
+
+app = create_asgi_app()
@@ -0,0 +1,128 @@
+import asyncio
+import itertools
+import os
+from contextlib import asynccontextmanager
+from mysql.connector.aio.pooling import MySQLConnectionPool
+from .config import Config
+from .database import PoolTimeout, pinned, replica_addresses
+from .metrics import metrics, timed
+
+
+pool = None
+slots = None
+replicas = None
+_replica_turn = itertools.count()
+_init_lock = asyncio.Lock()
+_inherited = []
+
+
+def reset_after_fork():
+    global pool, slots, replicas, _init_lock
+    _inherited.extend(active for active in [pool, *(replicas or [])] if active is not None)
+    pool = None
+    slots = None
+    replicas = None
+    _init_lock = asyncio.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+async def open_pool(name, host, port=3306):
+    created = MySQLConnectionPool(
+        pool_name=name,
+        pool_size=Config.ASYNC_POOL_SIZE,
+        host=host,
+        port=port,
+        user=Config.MYSQL_USER,
+        password=Config.MYSQL_PASSWORD,
+        database=Config.MYSQL_DB,
+        auth_plugin="mysql_native_password",
+        time_zone="+00:00",
+    )
+    await created.initialize_pool()
+    return created
+
+
+async def get_pool():
+    global pool, slots
+    if pool is None:
+        async with _init_lock:
+            if pool is None:
+                created = await open_pool(Config.MYSQL_POOL_NAME + "_async", Config.MYSQL_HOST)
+                slots = asyncio.Semaphore(Config.ASYNC_POOL_SIZE)
+                pool = created
+    return pool
+
+
+async def get_replica_pools():
+    global replicas
+    if replicas is None:
+        async with _init_lock:
+            if replicas is None:
+                opened = []
+                for number, (host, port) in enumerate(replica_addresses()):
+                    created = await open_pool(f"{Config.MYSQL_POOL_NAME}_async_replica{number}", host, port)
+                    opened.append((created, asyncio.Semaphore(Config.ASYNC_POOL_SIZE)))
+                replicas = opened
+    return replicas
+
+
+async def pick_pool(read):
+    # Same routing as the sync reads: replicas round-robin unless this client is pinned to the primary.
+    choices = await get_replica_pools() if read and not pinned() else []
+    if choices:
+        return choices[next(_replica_turn) % len(choices)]
+    active = await get_pool()
+    return active, slots
+
+
+async def get_connection(read=False):
+    active, gate = await pick_pool(read)
+    with timed("pool", "api_pool_wait_seconds"):
+        try:
+            await asyncio.wait_for(gate.acquire(), Config.MYSQL_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"Timed out after {Config.MYSQL_POOL_TIMEOUT:g}s waiting for a database connection") from None
+        try:
+            conn = await active.get_connection()
+        except BaseException:
+            gate.release()
+            raise
+    conn.slots = gate
+    if Config.METRICS_ENABLED:
+        metrics.inc("api_pool_checkouts_total")
+        metrics.gauge_add("api_pool_connections_in_use", 1)
+    return conn
+
+
+async def release_connection(conn):
+    try:
+        await conn.close()
+    finally:
+        conn.slots.release()
+        if Config.METRICS_ENABLED:
+            metrics.gauge_add("api_pool_connections_in_use", -1)
+
+
+@asynccontextmanager
+async def get_cursor(dictionary=True, read=False):
+    conn = await get_connection(read)
+    try:
+        cursor = await conn.cursor(dictionary=dictionary)
+        try:
+            yield conn, cursor
+        finally:
+            await cursor.close()
+    finally:
+        await release_connection(conn)
+
+
+async def close_pool():
+    global pool, slots, replicas
+    for active in [pool, *(created for created, _ in replicas or [])]:
+        if active is not None:
+            await active.close_pool()
+    pool = None
+    slots = None
+    replicas = None
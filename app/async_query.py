@@ -0,0 +1,190 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+from .async_database import get_connection, get_cursor, release_connection
+from .cache import async_cached
+from .config import Config
+from .metrics import statement_label, timed
+from .query import (
+    CLASS_SELECT,
+    WEAPON_SELECT,
+    STAT_SELECT,
+    VERSIONS_SELECT,
+    character_query,
+    character_select,
+    chunked,
+    order_by_ids,
+    page_rows,
+    placeholders,
+    row_class,
+    row_weapon,
+    row_stat,
+    row_character,
+)
+from .rows import CharacterRecord, StatRecord
+from .search import get_search_engine, trigram_search
+
+
+async def execute(cursor, query: str, params: tuple):
+    with timed("db", "api_query_duration_seconds", statement=statement_label(query)):
+        await cursor.execute(query, params)
+
+
+async def fetch_all(query: str, params: tuple, dictionary: bool = True) -> List[Any]:
+    async with get_cursor(dictionary, read=True) as (conn, cursor):
+        await execute(cursor, query, params)
+        with timed("db"):
+            return await cursor.fetchall()
+
+
+async def fetch_one(query: str, params: tuple) -> Optional[Dict[str, Any]]:
+    rows = await fetch_all(query, params)
+    return rows[0] if rows else None
+
+
+async def stream_rows(query: str, params: tuple, mapper, dictionary: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    conn = await get_connection(read=True)
+    cursor = await conn.cursor(dictionary=dictionary)
+    done = False
+    try:
+        await execute(cursor, query, params)
+        while True:
+            rows = await cursor.fetchmany(Config.STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield mapper(row)
+        done = True
+    finally:
+        try:
+            if done:
+                await cursor.close()
+            else:
+                # Dropping the socket skips the unread rows; the pool reconnects it on the next checkout.
+                await conn.shutdown()
+        finally:
+            await release_connection(conn)
+
+
+async def rows_by_ids(select: str, column: str, ids: tuple, mapper) -> (List[Dict[str, Any]], List[int]):
+    found = {}
+    async with get_cursor(read=True) as (conn, cursor):
+        for chunk in chunked(list(ids), Config.BULK_CHUNK_SIZE):
+            await execute(cursor, f"{select} WHERE {column} IN ({placeholders(len(chunk))})", tuple(chunk))
+            with timed("db"):
+                rows = await cursor.fetchall()
+            for row in rows:
+                item = mapper(row)
+                found[item["id"]] = item
+    return order_by_ids(found, ids)
+
+
+async def table_versions(tables: tuple) -> Dict[str, tuple]:
+    rows = await fetch_all(VERSIONS_SELECT.format(placeholders(len(tables))), tuple(tables))
+    return {row["name"]: (row["version"], row["updated_at"]) for row in rows}
+
+
+@async_cached("classes")
+async def list_classes(limit: int, after_id: Optional[int] = None) -> (List[Dict[str, Any]], Optional[int]):
+    rows = await fetch_all(CLASS_SELECT + " WHERE id > %s ORDER BY id LIMIT %s", (after_id or 0, limit + 1))
+    return page_rows(rows, limit, row_class)
+
+
+def iter_classes(after_id: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    return stream_rows(CLASS_SELECT + " WHERE id > %s ORDER BY id", (after_id or 0,), row_class)
+
+
+@async_cached("classes")
+async def get_class(class_id: int) -> Optional[Dict[str, Any]]:
+    row = await fetch_one(CLASS_SELECT + " WHERE id = %s", (class_id,))
+    return row_class(row) if row else None
+
+
+@async_cached("classes")
+async def classes_by_ids(ids: tuple) -> (List[Dict[str, Any]], List[int]):
+    return await rows_by_ids(CLASS_SELECT, "id", ids, row_class)
+
+
+@async_cached("weapons")
+async def list_weapons(limit: int, after_id: Optional[int] = None) -> (List[Dict[str, Any]], Optional[int]):
+    rows = await fetch_all(WEAPON_SELECT + " WHERE id > %s ORDER BY id LIMIT %s", (after_id or 0, limit + 1))
+    return page_rows(rows, limit, row_weapon)
+
+
+def iter_weapons(after_id: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    return stream_rows(WEAPON_SELECT + " WHERE id > %s ORDER BY id", (after_id or 0,), row_weapon)
+
+
+@async_cached("weapons")
+async def get_weapon(weapon_id: int) -> Optional[Dict[str, Any]]:
+    row = await fetch_one(WEAPON_SELECT + " WHERE id = %s", (weapon_id,))
+    return row_weapon(row) if row else None
+
+
+@async_cached("weapons")
+async def weapons_by_ids(ids: tuple) -> (List[Dict[str, Any]], List[int]):
+    return await rows_by_ids(WEAPON_SELECT, "id", ids, row_weapon)
+
+
+@async_cached("stats")
+async def list_stats(limit: int, after_id: Optional[int] = None) -> (List[Dict[str, Any]], Optional[int]):
+    compact = Config.COMPACT_ROWS
+    rows = await fetch_all(STAT_SELECT + " WHERE id > %s ORDER BY id LIMIT %s", (after_id or 0, limit + 1), dictionary=not compact)
+    return page_rows(rows, limit, StatRecord.from_row if compact else row_stat)
+
+
+def iter_stats(after_id: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    compact = Config.COMPACT_ROWS
+    return stream_rows(
+        STAT_SELECT + " WHERE id > %s ORDER BY id",
+        (after_id or 0,),
+        StatRecord.from_row if compact else row_stat,
+        dictionary=not compact,
+    )
+
+
+@async_cached("stats")
+async def get_stat(stat_id: int) -> Optional[Dict[str, Any]]:
+    row = await fetch_one(STAT_SELECT + " WHERE id = %s", (stat_id,))
+    return row_stat(row) if row else None
+
+
+@async_cached("stats")
+async def stats_by_ids(ids: tuple) -> (List[Dict[str, Any]], List[int]):
+    return await rows_by_ids(STAT_SELECT, "id", ids, row_stat)
+
+
+async def async_character_query(filters: Optional[Dict[str, Any]], after_id: Optional[int], expand: tuple) -> (str, List[Any]):
+    filters = filters or {}
+    if filters.get("name") and get_search_engine(filters.get("search")) is trigram_search:
+        # The trigram engine checks the characters version over the sync pool, which must stay off the event loop.
+        return await asyncio.to_thread(character_query, filters, after_id, expand)
+    return character_query(filters, after_id, expand)
+
+
+async def list_characters(filters: Optional[Dict[str, Any]], limit: int, after_id: Optional[int] = None, expand: tuple = ()) -> (List[Dict[str, Any]], Optional[int]):
+    query, params = await async_character_query(filters, after_id, expand)
+    params.append(limit + 1)
+    compact = Config.COMPACT_ROWS and not expand
+    rows = await fetch_all(query + " ORDER BY c.id LIMIT %s", tuple(params), dictionary=not compact)
+    return page_rows(rows, limit, CharacterRecord.from_row if compact else lambda row: row_character(row, expand))
+
+
+async def iter_characters(filters: Optional[Dict[str, Any]], after_id: Optional[int] = None, expand: tuple = ()) -> AsyncIterator[Dict[str, Any]]:
+    query, params = await async_character_query(filters, after_id, expand)
+    compact = Config.COMPACT_ROWS and not expand
+    mapper = CharacterRecord.from_row if compact else lambda row: row_character(row, expand)
+    rows = stream_rows(query + " ORDER BY c.id", tuple(params), mapper, dictionary=not compact)
+    try:
+        async for row in rows:
+            yield row
+    finally:
+        await rows.aclose()
+
+
+async def get_character(character_id: int, expand: tuple = ()) -> Optional[Dict[str, Any]]:
+    row = await fetch_one(character_select(expand) + " WHERE c.id = %s", (character_id,))
+    return row_character(row, expand) if row else None
+
+
+async def characters_by_ids(ids: tuple, expand: tuple = ()) -> (List[Dict[str, Any]], List[int]):
+    return await rows_by_ids(character_select(expand), "c.id", ids, lambda row: row_character(row, expand))
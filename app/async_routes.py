@@ -0,0 +1,144 @@
+import asyncio
+from functools import wraps
+from flask import current_app, make_response, request
+from . import async_query, response_cache
+from .routes import character_filters, not_modified, set_validators, validators
+from .utils import format_response, parse_expand, parse_format, parse_ids, parse_pagination, parse_stream_format, stream_parts
+
+
+class AsyncStream:
+    def __init__(self, key, rows, output_format):
+        head, encode_row, separator, tail, empty, mimetype = stream_parts(key, output_format)
+        self.response = current_app.response_class(iter(()), 200, mimetype=mimetype)
+        self.body = self.encode(rows, head, encode_row, separator, tail, empty)
+
+    @staticmethod
+    async def encode(rows, head, encode_row, separator, tail, empty):
+        first = True
+        try:
+            async for row in rows:
+                yield (head + encode_row(row) if first else separator + encode_row(row)).encode("utf-8")
+                first = False
+        finally:
+            await rows.aclose()
+        ending = empty if first else tail
+        if ending:
+            yield ending.encode("utf-8")
+
+
+def conditional(*tables):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            etag, last_modified = validators(await async_query.table_versions(tables))
+            if not_modified(etag, last_modified):
+                return set_validators(current_app.response_class(status=304), etag, last_modified)
+            result = await view(*args, **kwargs)
+            response = result.response if isinstance(result, AsyncStream) else make_response(result)
+            if response.status_code != 200:
+                return response
+            set_validators(response, etag, last_modified)
+            return result if isinstance(result, AsyncStream) else response
+        return wrapper
+    return decorator
+
+
+async def off_loop(func, *args):
+    # The shared store blocks on SQLite, so it runs in a thread; to_thread carries the request context along.
+    if response_cache.get_store().blocking:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+def response_cached(*tables):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            if response_cache.bypass():
+                return await view(*args, **kwargs)
+            key, generations, response = await off_loop(response_cache.lookup, tables)
+            if response is not None:
+                return response
+            with response_cache.fill_reads(generations):
+                result = await view(*args, **kwargs)
+            if isinstance(result, AsyncStream):
+                return result
+            return await off_loop(response_cache.remember, key, tables, generations, make_response(result))
+        return wrapper
+    return decorator
+
+
+def list_view(key, list_rows, iter_rows, rows_by_ids):
+    @response_cached(key)
+    @conditional(key)
+    async def view():
+        output_format = parse_format(request)
+        ids, error = parse_ids(request)
+        if error:
+            return format_response({"message": error}, 400, output_format)
+        if ids is not None:
+            items, missing = await rows_by_ids(ids)
+            return format_response({key: items, "missing": missing}, 200, output_format)
+        limit, after_id = parse_pagination(request)
+        stream_format = parse_stream_format(request)
+        if stream_format:
+            return AsyncStream(key, iter_rows(after_id), stream_format)
+        items, next_cursor = await list_rows(limit, after_id)
+        return format_response({key: items, "next_cursor": next_cursor}, 200, output_format)
+    return view
+
+
+def detail_view(key, get_row):
+    @response_cached(key)
+    @conditional(key)
+    async def view(**kwargs):
+        output_format = parse_format(request)
+        item = await get_row(*kwargs.values())
+        if not item:
+            return format_response({"message": "Not found"}, 404, output_format)
+        return format_response(item, 200, output_format)
+    return view
+
+
+@response_cached("characters", "stats", "classes", "weapons")
+@conditional("characters", "stats", "classes", "weapons")
+async def get_characters_route():
+    output_format = parse_format(request)
+    ids, error = parse_ids(request)
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    expand = parse_expand(request)
+    if ids is not None:
+        items, missing = await async_query.characters_by_ids(ids, expand)
+        return format_response({"characters": items, "missing": missing}, 200, output_format)
+    filters, error = character_filters()
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    limit, after_id = parse_pagination(request)
+    stream_format = parse_stream_format(request)
+    if stream_format:
+        return AsyncStream("characters", async_query.iter_characters(filters, after_id, expand), stream_format)
+    items, next_cursor = await async_query.list_characters(filters, limit, after_id, expand)
+    return format_response({"characters": items, "next_cursor": next_cursor}, 200, output_format)
+
+
+@response_cached("characters", "stats", "classes", "weapons")
+@conditional("characters", "stats", "classes", "weapons")
+async def get_character_route(character_id):
+    output_format = parse_format(request)
+    item = await async_query.get_character(character_id, parse_expand(request))
+    if not item:
+        return format_response({"message": "Not found"}, 404, output_format)
+    return format_response(item, 200, output_format)
+
+
+ASYNC_VIEWS = {
+    "api.get_classes": list_view("classes", async_query.list_classes, async_query.iter_classes, async_query.classes_by_ids),
+    "api.get_class_route": detail_view("classes", async_query.get_class),
+    "api.get_weapons": list_view("weapons", async_query.list_weapons, async_query.iter_weapons, async_query.weapons_by_ids),
+    "api.get_weapon_route": detail_view("weapons", async_query.get_weapon),
+    "api.get_stats_route": list_view("stats", async_query.list_stats, async_query.iter_stats, async_query.stats_by_ids),
+    "api.get_stat_route": detail_view("stats", async_query.get_stat),
+    "api.get_characters_route": get_characters_route,
+    "api.get_character_route": get_character_route,
+}
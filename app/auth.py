@@ -0,0 +1,40 @@
+import hashlib
+import time
+from flask_jwt_extended import JWTManager as BaseJWTManager
+from flask_jwt_extended.config import config
+from .cache import TTLCache
+from .config import Config
+from .metrics import metrics, timed
+
+
+token_cache = TTLCache(Config.JWT_CACHE_MAXSIZE, Config.JWT_CACHE_TTL)
+
+
+def token_key(encoded_token, csrf_value):
+    return hashlib.sha256(encoded_token.encode("utf-8")).digest(), csrf_value
+
+
+def count_token(result, saved=0.0):
+    if Config.METRICS_ENABLED:
+        metrics.inc(f"api_auth_cache_{result}_total")
+        if saved:
+            metrics.inc("api_auth_cache_saved_seconds_total", saved)
+
+
+class JWTManager(BaseJWTManager):
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        with timed("auth", "api_auth_duration_seconds"):
+            if not Config.JWT_CACHE_ENABLED or allow_expired:
+                return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+            # Only the signature check and claim parsing are cached; Flask-JWT-Extended still runs
+            # its type, freshness and blocklist checks on every request.
+            key = token_key(encoded_token, csrf_value)
+            hit, entry = token_cache.get(key)
+            if hit and entry[0] > time.time() - config.leeway:
+                count_token("hits", entry[2])
+                return dict(entry[1])
+            started = time.perf_counter()
+            claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+            token_cache.set(key, (claims.get("exp", float("inf")), dict(claims), time.perf_counter() - started))
+            count_token("misses")
+            return claims
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from .config import Config
+from .database import commit_hooks, pinned
+
+
+class TTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+caches = {table: TTLCache(Config.CACHE_MAXSIZE, Config.CACHE_TTL) for table in ("classes", "weapons", "stats")}
+seen_versions = {}
+
+
+def cached(table):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not Config.CACHE_ENABLED or (Config.MYSQL_REPLICA_HOSTS and pinned()):
+                return func(*args, **kwargs)
+            cache = caches[table]
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            hit, value = cache.get(key)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def async_cached(table):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not Config.CACHE_ENABLED or (Config.MYSQL_REPLICA_HOSTS and pinned()):
+                return await func(*args, **kwargs)
+            cache = caches[table]
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            hit, value = cache.get(key)
+            if hit:
+                return value
+            value = await func(*args, **kwargs)
+            cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidate(table=None):
+    for name, cache in caches.items():
+        if table is None or name == table:
+            cache.clear()
+
+
+def invalidate_written(tables):
+    # Runs right after COMMIT, so a write that re-reads its own row never sees the cached copy.
+    for table in tables:
+        invalidate(table)
+
+
+commit_hooks.append(invalidate_written)
+
+
+def sync_versions(current):
+    for table, version in current.items():
+        if table in caches and seen_versions.get(table) != version:
+            caches[table].clear()
+            seen_versions[table] = version
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in caches.items()}
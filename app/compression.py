@@ -0,0 +1,155 @@
+import zlib
+from flask import current_app, request
+from .cache import TTLCache
+from .config import Config
+from .metrics import timed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/xml", "application/x-ndjson", "text/plain", "text/xml"}
+
+
+class GzipCodec:
+    name = "gzip"
+
+    def compress(self, data):
+        return zlib.compress(data, Config.COMPRESS_LEVEL_GZIP, wbits=31)
+
+    def compressor(self):
+        return zlib.compressobj(Config.COMPRESS_LEVEL_GZIP, zlib.DEFLATED, 31)
+
+
+class BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=Config.COMPRESS_LEVEL_BROTLI)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class BrotliCodec:
+    name = "br"
+
+    def compress(self, data):
+        return brotli.compress(data, quality=Config.COMPRESS_LEVEL_BROTLI)
+
+    def compressor(self):
+        return BrotliStream()
+
+
+class ZstdCodec:
+    name = "zstd"
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=Config.COMPRESS_LEVEL_ZSTD).compress(data)
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=Config.COMPRESS_LEVEL_ZSTD).compressobj()
+
+
+CODECS = {"gzip": GzipCodec()}
+if brotli is not None:
+    CODECS["br"] = BrotliCodec()
+if zstandard is not None:
+    CODECS["zstd"] = ZstdCodec()
+PREFERENCE = ("zstd", "br", "gzip")
+
+precompressed_cache = TTLCache(Config.COMPRESS_CACHE_MAXSIZE, Config.CACHE_TTL)
+
+
+def precompressed(view):
+    view.precompressed = True
+    return view
+
+
+def negotiate(accept_encodings):
+    best, best_quality = None, 0
+    for name in PREFERENCE:
+        if name not in CODECS:
+            continue
+        quality = accept_encodings[name]
+        if quality > best_quality:
+            best, best_quality = CODECS[name], quality
+    return best
+
+
+def compress_stream(codec, chunks):
+    compressor = codec.compressor()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def acompress_stream(codec, chunks):
+    compressor = codec.compressor()
+    try:
+        async for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    finally:
+        await chunks.aclose()
+    yield compressor.flush()
+
+
+def stream_codec(response):
+    if not Config.COMPRESS_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return None
+    response.vary.add("Accept-Encoding")
+    codec = negotiate(request.accept_encodings)
+    if codec is not None:
+        response.headers["Content-Encoding"] = codec.name
+    return codec
+
+
+def is_precompressed():
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "precompressed", False)
+
+
+def compress_response(response):
+    if not Config.COMPRESS_ENABLED or response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    codec = negotiate(request.accept_encodings)
+    if codec is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_stream(codec, response.iter_encoded())
+        response.headers.pop("Content-Length", None)
+        response.headers["Content-Encoding"] = codec.name
+        return response
+    body = response.get_data()
+    if len(body) < Config.COMPRESS_MIN_SIZE:
+        return response
+    etag = response.get_etag()[0]
+    key = (etag, codec.name) if etag and is_precompressed() else None
+    hit, compressed = precompressed_cache.get(key) if key else (False, None)
+    if not hit:
+        with timed("compress", "api_compress_duration_seconds", encoding=codec.name):
+            compressed = codec.compress(body)
+        if key:
+            precompressed_cache.set(key, compressed)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = codec.name
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
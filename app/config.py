@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Config:
@@ -7,8 +8,52 @@ class Config:
     MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD", "admin")
     MYSQL_DB = os.environ.get("MYSQL_DB", "souls_db")
     MYSQL_POOL_NAME = "app_pool"
-    MYSQL_POOL_SIZE = int(os.environ.get("MYSQL_POOL_SIZE", "5"))
+    MYSQL_REPLICA_HOSTS = os.environ.get("MYSQL_REPLICA_HOSTS", "")
+    MYSQL_REPLICA_PIN_SECONDS = float(os.environ.get("MYSQL_REPLICA_PIN_SECONDS", "5"))
+    WEB_WORKERS = int(os.environ.get("WEB_WORKERS", str((os.cpu_count() or 1) * 2 + 1)))
+    WEB_THREADS = int(os.environ.get("WEB_THREADS", "4"))
+    # A request holds its request-scoped connection plus, while streaming, a dedicated one.
+    MYSQL_POOL_SIZE = int(os.environ.get("MYSQL_POOL_SIZE", str(WEB_THREADS * 2)))
+    MYSQL_POOL_OVERFLOW = int(os.environ.get("MYSQL_POOL_OVERFLOW", "4"))
+    MYSQL_POOL_TIMEOUT = float(os.environ.get("MYSQL_POOL_TIMEOUT", "5"))
+    MYSQL_POOL_RECYCLE = float(os.environ.get("MYSQL_POOL_RECYCLE", "1800"))
+    MYSQL_POOL_IDLE_TIMEOUT = float(os.environ.get("MYSQL_POOL_IDLE_TIMEOUT", "300"))
+    MYSQL_POOL_PING_INTERVAL = float(os.environ.get("MYSQL_POOL_PING_INTERVAL", "5"))
+    ASYNC_POOL_SIZE = int(os.environ.get("ASYNC_POOL_SIZE", "32"))
+    ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", "8"))
+    PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", "100"))
+    PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "1000"))
+    MULTI_GET_MAX_IDS = int(os.environ.get("MULTI_GET_MAX_IDS", "10000"))
+    STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", "1000"))
+    COMPACT_ROWS = os.environ.get("COMPACT_ROWS", "0") == "1"
+    CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "1") == "1"
+    CACHE_TTL = float(os.environ.get("CACHE_TTL", "30"))
+    CACHE_MAXSIZE = int(os.environ.get("CACHE_MAXSIZE", "1024"))
+    RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "off")
+    RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "souls_api_responses.sqlite3"))
+    RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "60"))
+    RESPONSE_CACHE_MAXBYTES = int(os.environ.get("RESPONSE_CACHE_MAXBYTES", str(64 * 1024 * 1024)))
+    ANALYTICS_CACHE_TTL = float(os.environ.get("ANALYTICS_CACHE_TTL", "300"))
+    BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", "100000"))
+    BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "1000"))
+    WRITE_READBACK = os.environ.get("WRITE_READBACK", "0") == "1"
+    SEARCH_MODE = os.environ.get("SEARCH_MODE", "contains")
+    TRIGRAM_MAX_IDS = int(os.environ.get("TRIGRAM_MAX_IDS", "1000"))
+    JSON_ENCODER = os.environ.get("JSON_ENCODER", "auto")
+    COMPRESS_ENABLED = os.environ.get("COMPRESS_ENABLED", "1") == "1"
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_LEVEL_GZIP = int(os.environ.get("COMPRESS_LEVEL_GZIP", "6"))
+    COMPRESS_LEVEL_BROTLI = int(os.environ.get("COMPRESS_LEVEL_BROTLI", "5"))
+    COMPRESS_LEVEL_ZSTD = int(os.environ.get("COMPRESS_LEVEL_ZSTD", "3"))
+    COMPRESS_CACHE_MAXSIZE = int(os.environ.get("COMPRESS_CACHE_MAXSIZE", "256"))
+    EXPLAIN_ENABLED = os.environ.get("EXPLAIN_ENABLED", "0") == "1"
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+    METRICS_DIR = os.environ.get("METRICS_DIR", "")
+    METRICS_EXPORT_INTERVAL = float(os.environ.get("METRICS_EXPORT_INTERVAL", "1"))
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "jays-secret")
+    JWT_CACHE_ENABLED = os.environ.get("JWT_CACHE_ENABLED", "0") == "1"
+    JWT_CACHE_MAXSIZE = int(os.environ.get("JWT_CACHE_MAXSIZE", "10000"))
+    JWT_CACHE_TTL = float(os.environ.get("JWT_CACHE_TTL", "300"))
     API_USER = os.environ.get("API_USER", "admin")
     API_PASSWORD = os.environ.get("API_PASSWORD", "password")
 
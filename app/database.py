@@ -1,32 +1,457 @@
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
 import mysql.connector
-from mysql.connector import pooling
+from mysql.connector.errors import Error as MySQLError, PoolError
+from flask import g, has_app_context, has_request_context, request
 from .config import Config
+from .metrics import instrument_cursor, metrics, timed
 
 
 pool = None
+replicas = None
+_replica_turn = itertools.count()
+_inherited = []
+PIN_COOKIE = "db_pin"
+commit_hooks = []
+log = logging.getLogger(__name__)
+
+
+def reset_after_fork():
+    global pool, replicas
+    # Keep the parent's pools referenced so the child never closes sockets it shares with the parent.
+    _inherited.extend(active for active in [pool, *(replicas or [])] if active is not None)
+    pool = None
+    replicas = None
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+class PooledConnection:
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def discard(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.discard(raw, abort=True)
+
+
+class Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+        self.may_create = False
+
+
+class ConnectionPool:
+    def __init__(self, connect, size, overflow=0, timeout=5.0, recycle=1800.0, idle_timeout=300.0, ping_interval=5.0):
+        self._connect = connect
+        self.size = size
+        self.overflow = overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self._idle = deque()
+        self._waiters = deque()
+        self._born = {}
+        self._lock = threading.Lock()
+        self.total = 0
+        self.in_use = 0
+        self.counters = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "reconnects": 0,
+            "discarded": 0,
+        }
+
+    def _create(self):
+        try:
+            raw = self._connect()
+        except BaseException:
+            with self._lock:
+                self.total -= 1
+                self._grant_slot()
+            raise
+        with self._lock:
+            self._born[id(raw)] = time.monotonic()
+            self.counters["created"] += 1
+        return raw
+
+    def _kill_query(self, raw):
+        # The abandoned connection is mid-result, so the server is told to stop sending rows from a second one.
+        try:
+            killer = self._connect()
+        except MySQLError:
+            log.warning("Could not open a connection to kill the query on connection %s", raw.connection_id)
+            return
+        try:
+            cursor = killer.cursor()
+            cursor.execute(f"KILL QUERY {int(raw.connection_id)}")
+            cursor.close()
+        except MySQLError:
+            log.warning("KILL QUERY failed for connection %s", raw.connection_id)
+        finally:
+            killer.close()
+
+    def _close(self, raw, abort=False):
+        with self._lock:
+            self._born.pop(id(raw), None)
+        if abort:
+            self._kill_query(raw)
+        try:
+            # shutdown() drops the socket without reading what is left of an unbuffered result set.
+            (raw.shutdown if abort else raw.close)()
+        except NotImplementedError:
+            # The C extension has no shutdown(); after KILL QUERY, close() only reads the rows already in flight.
+            log.warning("Connection %s has no shutdown(); closing it instead", raw.connection_id)
+            self._close(raw)
+        except MySQLError:
+            pass
+
+    def _grant_slot(self):
+        # Called with the lock held whenever a slot frees up: the oldest waiter opens a new connection.
+        if self._waiters and self.total < self.size + self.overflow:
+            waiter = self._waiters.popleft()
+            waiter.may_create = True
+            self.total += 1
+            waiter.event.set()
+
+    def _checkout(self):
+        with self._lock:
+            if not self._waiters:
+                if self._idle:
+                    return self._idle.pop()
+                if self.total < self.size + self.overflow:
+                    self.total += 1
+                    return None
+            waiter = Waiter()
+            self._waiters.append(waiter)
+            self.counters["waits"] += 1
+        started = time.monotonic()
+        waiter.event.wait(self.timeout)
+        with self._lock:
+            waited = time.monotonic() - started
+            self.counters["wait_seconds"] += waited
+            self.counters["max_wait_seconds"] = max(self.counters["max_wait_seconds"], waited)
+            if waiter.entry is None and not waiter.may_create:
+                self._waiters.remove(waiter)
+                self.counters["timeouts"] += 1
+                raise PoolTimeout(f"Timed out after {self.timeout:g}s waiting for a database connection")
+        return waiter.entry
+
+    def _usable(self, raw, last_used):
+        now = time.monotonic()
+        if now - self._born.get(id(raw), now) > self.recycle or now - last_used > self.idle_timeout:
+            with self._lock:
+                self.counters["recycled"] += 1
+            return False
+        if now - last_used > self.ping_interval:
+            try:
+                raw.ping(reconnect=False)
+            except MySQLError:
+                with self._lock:
+                    self.counters["reconnects"] += 1
+                return False
+        return True
+
+    def get_connection(self):
+        entry = self._checkout()
+        raw = None
+        if entry is not None:
+            raw, last_used = entry
+            if not self._usable(raw, last_used):
+                # The slot stays reserved while the stale connection is swapped for a fresh one.
+                self._close(raw)
+                raw = None
+        if raw is None:
+            raw = self._create()
+        with self._lock:
+            self.in_use += 1
+            self.counters["checkouts"] += 1
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        try:
+            raw.rollback()
+        except MySQLError:
+            self.discard(raw)
+            return
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            self.in_use -= 1
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.entry = (raw, now)
+                waiter.event.set()
+                return
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                stale.append(self._idle.popleft()[0])
+            if self.total - len(stale) > self.size:
+                stale.append(raw)
+            else:
+                self._idle.append((raw, now))
+            self.total -= len(stale)
+            self.counters["recycled"] += len(stale)
+        for conn in stale:
+            self._close(conn)
+
+    def discard(self, raw, abort=False):
+        self._close(raw, abort)
+        with self._lock:
+            self.in_use -= 1
+            self.total -= 1
+            self.counters["discarded"] += 1
+            self._grant_slot()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self.total -= len(idle)
+        for raw, _ in idle:
+            self._close(raw)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "overflow": self.overflow,
+                "total": self.total,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "waiting": len(self._waiters),
+                **self.counters,
+            }
+
+
+def connect(host=None, port=3306):
+    return mysql.connector.connect(
+        host=host or Config.MYSQL_HOST,
+        port=port,
+        user=Config.MYSQL_USER,
+        password=Config.MYSQL_PASSWORD,
+        database=Config.MYSQL_DB,
+        auth_plugin="mysql_native_password",
+        # table_versions.updated_at is served as Last-Modified, which must be UTC.
+        time_zone="+00:00",
+    )
+
+
+def make_pool(factory):
+    return ConnectionPool(
+        factory,
+        Config.MYSQL_POOL_SIZE,
+        overflow=Config.MYSQL_POOL_OVERFLOW,
+        timeout=Config.MYSQL_POOL_TIMEOUT,
+        recycle=Config.MYSQL_POOL_RECYCLE,
+        idle_timeout=Config.MYSQL_POOL_IDLE_TIMEOUT,
+        ping_interval=Config.MYSQL_POOL_PING_INTERVAL,
+    )
 
 
 def get_pool():
     global pool
     if pool is None:
-        pool = pooling.MySQLConnectionPool(
-            pool_name=Config.MYSQL_POOL_NAME,
-            pool_size=Config.MYSQL_POOL_SIZE,
-            host=Config.MYSQL_HOST,
-            user=Config.MYSQL_USER,
-            password=Config.MYSQL_PASSWORD,
-            database=Config.MYSQL_DB,
-            auth_plugin="mysql_native_password",
-        )
+        pool = make_pool(connect)
     return pool
 
 
-def get_connection():
-    return get_pool().get_connection()
+def replica_addresses():
+    addresses = []
+    for entry in Config.MYSQL_REPLICA_HOSTS.split(","):
+        host, _, port = entry.strip().partition(":")
+        if host:
+            addresses.append((host, int(port or 3306)))
+    return addresses
+
+
+def get_replica_pools():
+    global replicas
+    if replicas is None:
+        replicas = [make_pool(partial(connect, host, port)) for host, port in replica_addresses()]
+    return replicas
+
+
+def pinned():
+    if not has_app_context():
+        return False
+    if "db_conn" in g or g.get("db_pinned") or g.get("db_primary_reads"):
+        return True
+    return has_request_context() and request.cookies.get(PIN_COOKIE, 0.0, type=float) > time.time()
+
+
+def get_read_pool():
+    pools = get_replica_pools()
+    if not pools or pinned():
+        return get_pool()
+    return pools[next(_replica_turn) % len(pools)]
+
+
+def pool_stats():
+    active = get_pool()
+    return active.stats() if hasattr(active, "stats") else {}
+
+
+def replica_stats():
+    return [active.stats() for active in get_replica_pools()]
+
+
+def get_connection(read=False):
+    with timed("pool", "api_pool_wait_seconds"):
+        conn = (get_read_pool() if read else get_pool()).get_connection()
+    if Config.METRICS_ENABLED:
+        metrics.inc("api_pool_checkouts_total")
+        metrics.gauge_add("api_pool_connections_in_use", 1)
+    return conn
+
+
+def release_connection(conn, discard=False):
+    if discard and hasattr(conn, "discard"):
+        conn.discard()
+    else:
+        conn.close()
+    if Config.METRICS_ENABLED:
+        metrics.gauge_add("api_pool_connections_in_use", -1)
+
+
+def get_db(read=False):
+    if read and get_replica_pools() and not pinned():
+        if "db_read_conn" not in g:
+            g.db_read_conn = get_connection(read=True)
+        return g.db_read_conn
+    if "db_conn" not in g:
+        g.db_conn = get_connection()
+        g.db_tx_depth = 0
+    return g.db_conn
+
+
+def close_db(exc=None):
+    read_conn = g.pop("db_read_conn", None)
+    if read_conn is not None:
+        release_connection(read_conn)
+    conn = g.pop("db_conn", None)
+    g.pop("db_tx_depth", None)
+    if conn is None:
+        return
+    try:
+        if exc is not None:
+            conn.rollback()
+    finally:
+        release_connection(conn)
+
+
+def mark_written(conn, table):
+    conn.written_tables = getattr(conn, "written_tables", frozenset()) | {table}
+
+
+def committed(conn):
+    tables = getattr(conn, "written_tables", None)
+    conn.written_tables = frozenset()
+    pin_primary()
+    if tables:
+        for hook in commit_hooks:
+            hook(tables)
+
+
+def rolled_back(conn):
+    conn.rollback()
+    conn.written_tables = frozenset()
+
+
+def pin_primary():
+    if has_app_context():
+        g.db_pinned = time.time() + Config.MYSQL_REPLICA_PIN_SECONDS
+
+
+@contextmanager
+def primary_reads():
+    previous = g.get("db_primary_reads", False)
+    g.db_primary_reads = True
+    try:
+        yield
+    finally:
+        g.db_primary_reads = previous
+
+
+def set_pin_cookie(response):
+    until = g.get("db_pinned")
+    if until and Config.MYSQL_REPLICA_HOSTS:
+        response.set_cookie(PIN_COOKIE, f"{until:.3f}", max_age=math.ceil(Config.MYSQL_REPLICA_PIN_SECONDS), httponly=True)
+    return response
+
+
+@contextmanager
+def get_cursor(dictionary=True, read=False):
+    if has_app_context():
+        conn = get_db(read)
+        cursor = instrument_cursor(conn.cursor(dictionary=dictionary))
+        try:
+            yield conn, cursor
+        finally:
+            cursor.close()
+        return
+    conn = get_connection(read)
+    cursor = instrument_cursor(conn.cursor(dictionary=dictionary))
+    try:
+        yield conn, cursor
+    finally:
+        cursor.close()
+        release_connection(conn)
+
+
+def commit(conn):
+    if has_app_context() and g.get("db_tx_depth", 0) > 0:
+        return
+    conn.commit()
+    committed(conn)
+
 
+@contextmanager
+def transaction():
+    if not has_app_context():
+        raise RuntimeError("transaction() requires an application context")
+    conn = get_db()
+    g.db_tx_depth += 1
+    try:
+        yield conn
+    except Exception:
+        g.db_tx_depth -= 1
+        if g.db_tx_depth == 0:
+            rolled_back(conn)
+        raise
+    g.db_tx_depth -= 1
+    if g.db_tx_depth == 0:
+        conn.commit()
+        committed(conn)
 
-def get_cursor(dictionary=True):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=dictionary)
-    return conn, cursor
 
+def init_app(app):
+    app.after_request(set_pin_cookie)
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,48 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+from .config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+COMPACT = (",", ":")
+
+
+def use_orjson():
+    if Config.JSON_ENCODER == "stdlib":
+        return False
+    if Config.JSON_ENCODER == "orjson" and orjson is None:
+        raise RuntimeError("JSON_ENCODER=orjson but orjson is not installed")
+    return orjson is not None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def __init__(self, app):
+        super().__init__(app)
+        self.native = use_orjson()
+        if self.native:
+            self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                self.options |= orjson.OPT_SORT_KEYS
+
+    def dumps_bytes(self, obj, **kwargs):
+        if self.native and kwargs.get("separators", COMPACT) == COMPACT and not kwargs.get("indent"):
+            return orjson.dumps(obj, default=self.default, option=self.options)
+        return self.dumps(obj, **kwargs).encode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = self.dumps_bytes(obj, indent=2)
+        else:
+            body = self.dumps_bytes(obj, separators=COMPACT)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def dumps_row(row):
+    if orjson is not None and Config.JSON_ENCODER != "stdlib":
+        return orjson.dumps(row).decode("utf-8")
+    return json.dumps(row, separators=COMPACT, default=dict)
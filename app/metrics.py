@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import g, has_app_context, request
+from .config import Config
+
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge_add(self, name, amount, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def gauge_set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "gauges": [[name, labels, value] for (name, labels), value in self.gauges.items()],
+                "histograms": [[name, labels, h.counts, h.sum, h.count] for (name, labels), h in self.histograms.items()],
+            }
+
+    def merge(self, snapshot, gauges=True):
+        # Counters and histograms add up across processes; gauges only while their process is alive.
+        with self._lock:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, value in snapshot["gauges"] if gauges else ():
+                key = (name, tuple(map(tuple, labels)))
+                self.gauges[key] = self.gauges.get(key, 0) + value
+            for name, labels, counts, total, count in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({key[0] for key in series}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f"{name}{format_labels(labels)} {value}")
+            for name in sorted({key[0] for key in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (series_name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+
+metrics = Metrics()
+_last_export = 0.0
+
+
+def export_path(pid):
+    return os.path.join(Config.METRICS_DIR, f"metrics-{pid}.json")
+
+
+def export(force=False):
+    global _last_export
+    if not Config.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_export < Config.METRICS_EXPORT_INTERVAL:
+        return
+    _last_export = now
+    path = export_path(os.getpid())
+    temporary = f"{path}.{threading.get_ident()}.tmp"
+    with open(temporary, "w") as handle:
+        json.dump(metrics.snapshot(), handle)
+    os.replace(temporary, path)
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    # Each gunicorn worker keeps its own registry, so a scrape merges the snapshots every worker exports.
+    if not Config.METRICS_DIR:
+        return metrics
+    combined = Metrics()
+    combined.merge(metrics.snapshot())
+    for entry in os.scandir(Config.METRICS_DIR):
+        name = entry.name
+        if not (name.startswith("metrics-") and name.endswith(".json")):
+            continue
+        pid = int(name[len("metrics-"):-len(".json")])
+        if pid == os.getpid():
+            continue
+        try:
+            with open(entry.path) as handle:
+                snapshot = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        combined.merge(snapshot, gauges=process_alive(pid))
+    return combined
+
+
+def clear_exports():
+    if Config.METRICS_DIR and os.path.isdir(Config.METRICS_DIR):
+        for entry in os.scandir(Config.METRICS_DIR):
+            if entry.name.startswith("metrics-"):
+                os.unlink(entry.path)
+
+
+def record_phase(phase, elapsed):
+    if has_app_context():
+        timings = g.setdefault("timings", {})
+        timings[phase] = timings.get(phase, 0.0) + elapsed
+
+
+@contextmanager
+def timed(phase, histogram=None, **labels):
+    if not Config.METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record_phase(phase, elapsed)
+        if histogram:
+            metrics.observe(histogram, elapsed, **labels)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(sql):
+    verb = sql.lstrip("( ").split(" ", 1)[0].upper()
+    match = STATEMENT_TABLE.search(sql)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, sql, params=()):
+        with timed("db", "api_query_duration_seconds", statement=statement_label(sql)):
+            return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        with timed("db", "api_query_duration_seconds", statement=statement_label(sql)):
+            return self._cursor.executemany(sql, seq_params)
+
+    def fetchone(self):
+        with timed("db"):
+            row = self._cursor.fetchone()
+        metrics.inc("api_rows_returned_total", 1 if row is not None else 0)
+        return row
+
+    def fetchall(self):
+        with timed("db"):
+            rows = self._cursor.fetchall()
+        metrics.inc("api_rows_returned_total", len(rows))
+        return rows
+
+    def fetchmany(self, size=1):
+        with timed("db"):
+            rows = self._cursor.fetchmany(size)
+        metrics.inc("api_rows_returned_total", len(rows))
+        return rows
+
+    def close(self):
+        return self._cursor.close()
+
+
+def instrument_cursor(cursor):
+    return InstrumentedCursor(cursor) if Config.METRICS_ENABLED else cursor
+
+
+def server_timing(timings, total):
+    parts = [f"{phase};dur={elapsed * 1000:.3f}" for phase, elapsed in timings.items()]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+def before_request():
+    if Config.METRICS_ENABLED:
+        g.request_started = time.perf_counter()
+
+
+def after_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    total = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe("api_request_duration_seconds", total, route=route, method=request.method)
+    metrics.inc("api_requests_total", route=route, method=request.method, status=response.status_code)
+    if not response.is_streamed:
+        metrics.inc("api_response_bytes_total", response.calculate_content_length() or 0, route=route)
+    response.headers["Server-Timing"] = server_timing(g.get("timings", {}), total)
+    export()
+    return response
+
+
+def init_app(app):
+    app.before_request(before_request)
+    app.after_request(after_request)
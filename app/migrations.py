@@ -0,0 +1,41 @@
+from pathlib import Path
+from typing import List
+import click
+from .database import get_cursor
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
+
+
+def split_statements(sql: str) -> List[str]:
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def apply_migrations(directory: Path = MIGRATIONS_DIR) -> List[str]:
+    applied_now = []
+    with get_cursor() as (conn, cursor):
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(255) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        cursor.execute("SELECT name FROM schema_migrations")
+        applied = {row["name"] for row in cursor.fetchall()}
+        for path in sorted(directory.glob("*.sql")):
+            if path.name in applied:
+                continue
+            for statement in split_statements(path.read_text(encoding="utf-8")):
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (path.name,))
+            conn.commit()
+            applied_now.append(path.name)
+    return applied_now
+
+
+@click.command("migrate")
+def migrate_command():
+    applied = apply_migrations()
+    click.echo("\n".join(f"Applied {name}" for name in applied) or "No pending migrations")
+
+
+def init_app(app):
+    app.cli.add_command(migrate_command)
@@ -1,202 +1,283 @@
-from typing import List, Optional, Dict, Any
-from .database import get_cursor
+from typing import List, Optional, Dict, Any, Iterator
+from .cache import cached
+from .config import Config
+from .database import get_connection, get_cursor, commit, mark_written, release_connection, transaction
+from .metrics import instrument_cursor
+from .rows import CharacterRecord, StatRecord
+from .search import get_search_engine, trigram_search
 
 
-def record_exists(table: str, record_id: int) -> bool:
-    conn, cursor = get_cursor()
+CLASS_SELECT = "SELECT id, name, description FROM classes"
+WEAPON_SELECT = "SELECT id, name, type, description FROM weapons"
+STAT_SELECT = "SELECT id, strength, intelligence, dexterity, stamina, faith, agility FROM stats"
+VERSIONS_SELECT = "SELECT name, version, updated_at FROM table_versions WHERE name IN ({})"
+BUMP_VERSION = "UPDATE table_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE name = %s"
+
+
+def bump_version(conn, table: str):
+    cursor = instrument_cursor(conn.cursor())
     try:
-        cursor.execute(f"SELECT id FROM {table} WHERE id = %s", (record_id,))
-        return cursor.fetchone() is not None
+        cursor.execute(BUMP_VERSION, (table,))
     finally:
         cursor.close()
-        conn.close()
+    mark_written(conn, table)
 
 
-def characters_in_use(field: str, value: int) -> bool:
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute(f"SELECT COUNT(*) AS cnt FROM characters WHERE {field} = %s", (value,))
+def update_outcome(cursor, table: str, record_id: int) -> Optional[bool]:
+    # rowcount counts changed rows, so 0 is also what a rewrite of identical values reports: True changed, False unchanged, None missing.
+    if cursor.rowcount > 0:
+        return True
+    cursor.execute(f"SELECT id FROM {table} WHERE id = %s", (record_id,))
+    return False if cursor.fetchall() else None
+
+
+def table_versions(tables: tuple) -> Dict[str, tuple]:
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute(VERSIONS_SELECT.format(placeholders(len(tables))), tuple(tables))
+        return {row["name"]: (row["version"], row["updated_at"]) for row in cursor.fetchall()}
+
+
+def delete_referenced(table: str, record_id: int) -> (bool, str):
+    field = REFERENCE_FIELDS[table]
+    with transaction(), get_cursor() as (conn, cursor):
+        cursor.execute(
+            f"SELECT EXISTS(SELECT 1 FROM characters WHERE {field} = t.id) AS in_use FROM {table} t WHERE t.id = %s FOR UPDATE",
+            (record_id,),
+        )
         row = cursor.fetchone()
-        return row["cnt"] > 0
-    finally:
-        cursor.close()
-        conn.close()
+        if row is None:
+            return False, "not_found"
+        if row["in_use"]:
+            return False, "in_use"
+        cursor.execute(f"DELETE FROM {table} WHERE id = %s", (record_id,))
+        if cursor.rowcount == 0:
+            return False, "not_found"
+        bump_version(conn, table)
+        return True, ""
 
 
 def row_class(row: Dict[str, Any]) -> Dict[str, Any]:
-    return {"id": row["id"], "name": row["name"], "description": row["description"]}
+    return row
 
 
 def row_weapon(row: Dict[str, Any]) -> Dict[str, Any]:
-    return {"id": row["id"], "name": row["name"], "type": row["type"], "description": row["description"]}
+    return row
 
 
 def row_stat(row: Dict[str, Any]) -> Dict[str, Any]:
-    return {
-        "id": row["id"],
-        "strength": row["strength"],
-        "intelligence": row["intelligence"],
-        "dexterity": row["dexterity"],
-        "stamina": row["stamina"],
-        "faith": row["faith"],
-        "agility": row["agility"],
-    }
+    return row
+
 
+CHARACTER_EXPANSIONS = {
+    "stats": ("s", "JOIN stats s ON c.stat_id = s.id", ["id", "strength", "intelligence", "dexterity", "stamina", "faith", "agility"]),
+    "class": ("cl", "JOIN classes cl ON c.class_id = cl.id", ["id", "name", "description"]),
+    "weapon": ("w", "JOIN weapons w ON c.weapon_id = w.id", ["id", "name", "type", "description"]),
+}
 
-def row_character(row: Dict[str, Any]) -> Dict[str, Any]:
-    return {
+
+def row_character(row: Dict[str, Any], expand: tuple = ()) -> Dict[str, Any]:
+    if not expand:
+        return row
+    item = {
         "id": row["id"],
         "name": row["name"],
         "stat_id": row["stat_id"],
         "class_id": row["class_id"],
         "weapon_id": row["weapon_id"],
     }
+    for name in expand:
+        item[name] = {col: row[f"{name}__{col}"] for col in CHARACTER_EXPANSIONS[name][2]}
+    return item
+
+
+def written_row(cursor, item: Dict[str, Any], query: str, mapper) -> Optional[Dict[str, Any]]:
+    if not Config.WRITE_READBACK:
+        return item
+    # Read back on the writer's own cursor: the cached getters and replicas may still hold the old row.
+    cursor.execute(query, (item["id"],))
+    row = cursor.fetchone()
+    return mapper(row) if row else None
+
+
+def page_rows(rows: List[Dict[str, Any]], limit: int, mapper) -> (List[Dict[str, Any]], Optional[int]):
+    items = [mapper(row) for row in rows[:limit]]
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return items, next_cursor
+
+
+def order_by_ids(found: Dict[int, Dict[str, Any]], ids: tuple) -> (List[Dict[str, Any]], List[int]):
+    return [found[record_id] for record_id in ids if record_id in found], [record_id for record_id in ids if record_id not in found]
 
 
-def list_classes() -> List[Dict[str, Any]]:
-    conn, cursor = get_cursor()
+def rows_by_ids(select: str, column: str, ids: tuple, mapper) -> (List[Dict[str, Any]], List[int]):
+    found = {}
+    with get_cursor(read=True) as (conn, cursor):
+        for chunk in chunked(list(ids), Config.BULK_CHUNK_SIZE):
+            cursor.execute(f"{select} WHERE {column} IN ({placeholders(len(chunk))})", tuple(chunk))
+            for row in cursor.fetchall():
+                item = mapper(row)
+                found[item["id"]] = item
+    return order_by_ids(found, ids)
+
+
+def stream_rows(query: str, params: tuple, mapper, dictionary: bool = True) -> Iterator[Dict[str, Any]]:
+    conn = get_connection(read=True)
+    cursor = instrument_cursor(conn.cursor(dictionary=dictionary, buffered=False))
+    done = False
     try:
-        cursor.execute("SELECT id, name, description FROM classes ORDER BY id")
-        return [row_class(row) for row in cursor.fetchall()]
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(Config.STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield mapper(row)
+        done = True
     finally:
-        cursor.close()
-        conn.close()
+        if done:
+            cursor.close()
+        # An abandoned export still has rows in flight, so its connection is dropped instead of drained.
+        release_connection(conn, discard=not done)
+
+
+@cached("classes")
+def list_classes(limit: int, after_id: Optional[int] = None) -> (List[Dict[str, Any]], Optional[int]):
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute(
+            CLASS_SELECT + " WHERE id > %s ORDER BY id LIMIT %s",
+            (after_id or 0, limit + 1),
+        )
+        return page_rows(cursor.fetchall(), limit, row_class)
 
 
+def iter_classes(after_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    return stream_rows(CLASS_SELECT + " WHERE id > %s ORDER BY id", (after_id or 0,), row_class)
+
+
+@cached("classes")
 def get_class(class_id: int) -> Optional[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("SELECT id, name, description FROM classes WHERE id = %s", (class_id,))
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute(CLASS_SELECT + " WHERE id = %s", (class_id,))
         row = cursor.fetchone()
         return row_class(row) if row else None
-    finally:
-        cursor.close()
-        conn.close()
+
+
+@cached("classes")
+def classes_by_ids(ids: tuple) -> (List[Dict[str, Any]], List[int]):
+    return rows_by_ids(CLASS_SELECT, "id", ids, row_class)
 
 
 def create_class(name: str, description: str) -> Dict[str, Any]:
-    conn, cursor = get_cursor()
-    try:
+    with get_cursor() as (conn, cursor):
         cursor.execute("INSERT INTO classes (name, description) VALUES (%s, %s)", (name, description))
-        conn.commit()
-        return get_class(cursor.lastrowid)
-    finally:
-        cursor.close()
-        conn.close()
+        bump_version(conn, "classes")
+        commit(conn)
+        return written_row(cursor, {"id": cursor.lastrowid, "name": name, "description": description}, CLASS_SELECT + " WHERE id = %s", row_class)
 
 
 def update_class(class_id: int, name: str, description: str) -> Optional[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
+    with get_cursor() as (conn, cursor):
         cursor.execute("UPDATE classes SET name = %s, description = %s WHERE id = %s", (name, description, class_id))
-        conn.commit()
-        if cursor.rowcount == 0:
+        changed = update_outcome(cursor, "classes", class_id)
+        if changed:
+            bump_version(conn, "classes")
+        commit(conn)
+        if changed is None:
             return None
-        return get_class(class_id)
-    finally:
-        cursor.close()
-        conn.close()
+        return written_row(cursor, {"id": class_id, "name": name, "description": description}, CLASS_SELECT + " WHERE id = %s", row_class)
 
 
 def delete_class(class_id: int) -> (bool, str):
-    if not record_exists("classes", class_id):
-        return False, "not_found"
-    if characters_in_use("class_id", class_id):
-        return False, "in_use"
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("DELETE FROM classes WHERE id = %s", (class_id,))
-        conn.commit()
-        return cursor.rowcount > 0, ""
-    finally:
-        cursor.close()
-        conn.close()
+    return delete_referenced("classes", class_id)
 
 
-def list_weapons() -> List[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("SELECT id, name, type, description FROM weapons ORDER BY id")
-        return [row_weapon(row) for row in cursor.fetchall()]
-    finally:
-        cursor.close()
-        conn.close()
+@cached("weapons")
+def list_weapons(limit: int, after_id: Optional[int] = None) -> (List[Dict[str, Any]], Optional[int]):
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute(
+            WEAPON_SELECT + " WHERE id > %s ORDER BY id LIMIT %s",
+            (after_id or 0, limit + 1),
+        )
+        return page_rows(cursor.fetchall(), limit, row_weapon)
+
 
+def iter_weapons(after_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    return stream_rows(WEAPON_SELECT + " WHERE id > %s ORDER BY id", (after_id or 0,), row_weapon)
 
+
+@cached("weapons")
 def get_weapon(weapon_id: int) -> Optional[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("SELECT id, name, type, description FROM weapons WHERE id = %s", (weapon_id,))
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute(WEAPON_SELECT + " WHERE id = %s", (weapon_id,))
         row = cursor.fetchone()
         return row_weapon(row) if row else None
-    finally:
-        cursor.close()
-        conn.close()
+
+
+@cached("weapons")
+def weapons_by_ids(ids: tuple) -> (List[Dict[str, Any]], List[int]):
+    return rows_by_ids(WEAPON_SELECT, "id", ids, row_weapon)
 
 
 def create_weapon(name: str, weapon_type: str, description: str) -> Dict[str, Any]:
-    conn, cursor = get_cursor()
-    try:
+    with get_cursor() as (conn, cursor):
         cursor.execute("INSERT INTO weapons (name, type, description) VALUES (%s, %s, %s)", (name, weapon_type, description))
-        conn.commit()
-        return get_weapon(cursor.lastrowid)
-    finally:
-        cursor.close()
-        conn.close()
+        bump_version(conn, "weapons")
+        commit(conn)
+        return written_row(cursor, {"id": cursor.lastrowid, "name": name, "type": weapon_type, "description": description}, WEAPON_SELECT + " WHERE id = %s", row_weapon)
 
 
 def update_weapon(weapon_id: int, name: str, weapon_type: str, description: str) -> Optional[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
+    with get_cursor() as (conn, cursor):
         cursor.execute("UPDATE weapons SET name = %s, type = %s, description = %s WHERE id = %s", (name, weapon_type, description, weapon_id))
-        conn.commit()
-        if cursor.rowcount == 0:
+        changed = update_outcome(cursor, "weapons", weapon_id)
+        if changed:
+            bump_version(conn, "weapons")
+        commit(conn)
+        if changed is None:
             return None
-        return get_weapon(weapon_id)
-    finally:
-        cursor.close()
-        conn.close()
+        return written_row(cursor, {"id": weapon_id, "name": name, "type": weapon_type, "description": description}, WEAPON_SELECT + " WHERE id = %s", row_weapon)
 
 
 def delete_weapon(weapon_id: int) -> (bool, str):
-    if not record_exists("weapons", weapon_id):
-        return False, "not_found"
-    if characters_in_use("weapon_id", weapon_id):
-        return False, "in_use"
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("DELETE FROM weapons WHERE id = %s", (weapon_id,))
-        conn.commit()
-        return cursor.rowcount > 0, ""
-    finally:
-        cursor.close()
-        conn.close()
+    return delete_referenced("weapons", weapon_id)
 
 
-def list_stats() -> List[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("SELECT id, strength, intelligence, dexterity, stamina, faith, agility FROM stats ORDER BY id")
-        return [row_stat(row) for row in cursor.fetchall()]
-    finally:
-        cursor.close()
-        conn.close()
+@cached("stats")
+def list_stats(limit: int, after_id: Optional[int] = None) -> (List[Dict[str, Any]], Optional[int]):
+    compact = Config.COMPACT_ROWS
+    with get_cursor(dictionary=not compact, read=True) as (conn, cursor):
+        cursor.execute(
+            STAT_SELECT + " WHERE id > %s ORDER BY id LIMIT %s",
+            (after_id or 0, limit + 1),
+        )
+        return page_rows(cursor.fetchall(), limit, StatRecord.from_row if compact else row_stat)
+
 
+def iter_stats(after_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    compact = Config.COMPACT_ROWS
+    return stream_rows(
+        STAT_SELECT + " WHERE id > %s ORDER BY id",
+        (after_id or 0,),
+        StatRecord.from_row if compact else row_stat,
+        dictionary=not compact,
+    )
 
+
+@cached("stats")
 def get_stat(stat_id: int) -> Optional[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("SELECT id, strength, intelligence, dexterity, stamina, faith, agility FROM stats WHERE id = %s", (stat_id,))
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute(STAT_SELECT + " WHERE id = %s", (stat_id,))
         row = cursor.fetchone()
         return row_stat(row) if row else None
-    finally:
-        cursor.close()
-        conn.close()
+
+
+@cached("stats")
+def stats_by_ids(ids: tuple) -> (List[Dict[str, Any]], List[int]):
+    return rows_by_ids(STAT_SELECT, "id", ids, row_stat)
 
 
 def create_stat(values: Dict[str, int]) -> Dict[str, Any]:
-    conn, cursor = get_cursor()
-    try:
+    with get_cursor() as (conn, cursor):
         cursor.execute(
             "INSERT INTO stats (strength, intelligence, dexterity, stamina, faith, agility) VALUES (%s, %s, %s, %s, %s, %s)",
             (
@@ -208,16 +289,13 @@ def create_stat(values: Dict[str, int]) -> Dict[str, Any]:
                 values["agility"],
             ),
         )
-        conn.commit()
-        return get_stat(cursor.lastrowid)
-    finally:
-        cursor.close()
-        conn.close()
+        bump_version(conn, "stats")
+        commit(conn)
+        return written_row(cursor, row_stat({"id": cursor.lastrowid, **values}), STAT_SELECT + " WHERE id = %s", row_stat)
 
 
 def update_stat(stat_id: int, values: Dict[str, int]) -> Optional[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
+    with get_cursor() as (conn, cursor):
         cursor.execute(
             "UPDATE stats SET strength = %s, intelligence = %s, dexterity = %s, stamina = %s, faith = %s, agility = %s WHERE id = %s",
             (
@@ -230,112 +308,280 @@ def update_stat(stat_id: int, values: Dict[str, int]) -> Optional[Dict[str, Any]
                 stat_id,
             ),
         )
-        conn.commit()
-        if cursor.rowcount == 0:
+        changed = update_outcome(cursor, "stats", stat_id)
+        if changed:
+            bump_version(conn, "stats")
+        commit(conn)
+        if changed is None:
             return None
-        return get_stat(stat_id)
-    finally:
-        cursor.close()
-        conn.close()
+        return written_row(cursor, row_stat({"id": stat_id, **values}), STAT_SELECT + " WHERE id = %s", row_stat)
 
 
 def delete_stat(stat_id: int) -> (bool, str):
-    if not record_exists("stats", stat_id):
-        return False, "not_found"
-    if characters_in_use("stat_id", stat_id):
-        return False, "in_use"
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("DELETE FROM stats WHERE id = %s", (stat_id,))
-        conn.commit()
-        return cursor.rowcount > 0, ""
-    finally:
-        cursor.close()
-        conn.close()
+    return delete_referenced("stats", stat_id)
+
+
+def character_select(expand: tuple = ()) -> str:
+    columns = ["c.id", "c.name", "c.stat_id", "c.class_id", "c.weapon_id"]
+    joins = []
+    for name in expand:
+        alias, join, cols = CHARACTER_EXPANSIONS[name]
+        columns.extend(f"{alias}.{col} AS {name}__{col}" for col in cols)
+        joins.append(join)
+    return "SELECT " + ", ".join(columns) + " FROM characters c" + "".join(" " + join for join in joins)
+
 
+STAT_FIELDS = ["strength", "intelligence", "dexterity", "stamina", "faith", "agility"]
+# Predicates are grouped by access type (equality, range, scan) only to keep the generated SQL stable and readable;
+# MySQL picks indexes from its statistics whatever the order of the WHERE clause.
+RANK_EQUALITY = 1
+RANK_RANGE = 3
 
-def list_characters(filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+
+def character_predicates(filters: Optional[Dict[str, Any]], after_id: Optional[int] = None, stats_joined: bool = False) -> List[tuple]:
     filters = filters or {}
-    join_stats = any(filters.get(f"{stat}_min") is not None for stat in ["strength", "intelligence", "dexterity", "stamina", "faith", "agility"])
-    query = "SELECT c.id, c.name, c.stat_id, c.class_id, c.weapon_id FROM characters c"
-    if join_stats:
-        query += " JOIN stats s ON c.stat_id = s.id"
-    conditions = []
-    params = []
+    predicates = []
     if filters.get("name"):
-        conditions.append("c.name LIKE %s")
-        params.append(f"%{filters['name']}%")
+        engine = get_search_engine(filters.get("search"))
+        condition, values = engine.condition("c.name", filters["name"])
+        predicates.append((engine.rank, condition, values))
     if filters.get("class_id") is not None:
-        conditions.append("c.class_id = %s")
-        params.append(filters["class_id"])
+        predicates.append((RANK_EQUALITY, "c.class_id = %s", [filters["class_id"]]))
     if filters.get("weapon_id") is not None:
-        conditions.append("c.weapon_id = %s")
-        params.append(filters["weapon_id"])
-    for stat in ["strength", "intelligence", "dexterity", "stamina", "faith", "agility"]:
-        key = f"{stat}_min"
-        if filters.get(key) is not None:
-            conditions.append(f"s.{stat} >= %s")
-            params.append(filters[key])
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY c.id"
-    conn, cursor = get_cursor()
-    try:
+        predicates.append((RANK_EQUALITY, "c.weapon_id = %s", [filters["weapon_id"]]))
+    if after_id is not None:
+        predicates.append((RANK_RANGE, "c.id > %s", [after_id]))
+    minimums = [(filters[f"{stat}_min"], stat) for stat in STAT_FIELDS if filters.get(f"{stat}_min") is not None]
+    if minimums and stats_joined:
+        predicates.extend((RANK_RANGE, f"s.{stat} >= %s", [value]) for value, stat in minimums)
+    elif minimums:
+        # stat_id references a primary key, so a semi-join filters characters without widening the select.
+        conditions = " AND ".join(f"s.{stat} >= %s" for _, stat in minimums)
+        predicates.append((RANK_RANGE, f"EXISTS (SELECT 1 FROM stats s WHERE s.id = c.stat_id AND {conditions})", [value for value, _ in minimums]))
+    return sorted(predicates, key=lambda predicate: predicate[0])
+
+
+def character_where(filters: Optional[Dict[str, Any]], after_id: Optional[int] = None, stats_joined: bool = False) -> (str, List[Any]):
+    predicates = character_predicates(filters, after_id, stats_joined)
+    params = [value for _, _, values in predicates for value in values]
+    return (" WHERE " + " AND ".join(condition for _, condition, _ in predicates) if predicates else ""), params
+
+
+def character_query(filters: Optional[Dict[str, Any]], after_id: Optional[int] = None, expand: tuple = ()) -> (str, List[Any]):
+    where, params = character_where(filters, after_id, stats_joined="stats" in expand)
+    return character_select(expand) + where, params
+
+
+def explain_characters(filters: Optional[Dict[str, Any]], limit: int, after_id: Optional[int] = None, expand: tuple = ()) -> (str, List[Any], List[Dict[str, Any]]):
+    query, params = character_query(filters, after_id, expand)
+    query += " ORDER BY c.id LIMIT %s"
+    params.append(limit + 1)
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute("EXPLAIN " + query, tuple(params))
+        return query, params, cursor.fetchall()
+
+
+def list_characters(filters: Optional[Dict[str, Any]], limit: int, after_id: Optional[int] = None, expand: tuple = ()) -> (List[Dict[str, Any]], Optional[int]):
+    query, params = character_query(filters, after_id, expand)
+    query += " ORDER BY c.id LIMIT %s"
+    params.append(limit + 1)
+    compact = Config.COMPACT_ROWS and not expand
+    with get_cursor(dictionary=not compact, read=True) as (conn, cursor):
         cursor.execute(query, tuple(params))
-        return [row_character(row) for row in cursor.fetchall()]
-    finally:
-        cursor.close()
-        conn.close()
+        return page_rows(cursor.fetchall(), limit, CharacterRecord.from_row if compact else lambda row: row_character(row, expand))
 
 
-def get_character(character_id: int) -> Optional[Dict[str, Any]]:
-    conn, cursor = get_cursor()
-    try:
-        cursor.execute("SELECT id, name, stat_id, class_id, weapon_id FROM characters WHERE id = %s", (character_id,))
+def iter_characters(filters: Optional[Dict[str, Any]], after_id: Optional[int] = None, expand: tuple = ()) -> Iterator[Dict[str, Any]]:
+    query, params = character_query(filters, after_id, expand)
+    compact = Config.COMPACT_ROWS and not expand
+    mapper = CharacterRecord.from_row if compact else lambda row: row_character(row, expand)
+    return stream_rows(query + " ORDER BY c.id", tuple(params), mapper, dictionary=not compact)
+
+
+def get_character(character_id: int, expand: tuple = ()) -> Optional[Dict[str, Any]]:
+    with get_cursor(read=True) as (conn, cursor):
+        cursor.execute(character_select(expand) + " WHERE c.id = %s", (character_id,))
         row = cursor.fetchone()
-        return row_character(row) if row else None
-    finally:
-        cursor.close()
-        conn.close()
+        return row_character(row, expand) if row else None
+
+
+def characters_by_ids(ids: tuple, expand: tuple = ()) -> (List[Dict[str, Any]], List[int]):
+    return rows_by_ids(character_select(expand), "c.id", ids, lambda row: row_character(row, expand))
 
 
 def create_character(name: str, stat_id: int, class_id: int, weapon_id: int) -> (Optional[Dict[str, Any]], Optional[str]):
-    if not record_exists("stats", stat_id) or not record_exists("classes", class_id) or not record_exists("weapons", weapon_id):
-        return None, "invalid_foreign"
-    conn, cursor = get_cursor()
-    try:
+    item = {"name": name, "stat_id": stat_id, "class_id": class_id, "weapon_id": weapon_id}
+    with transaction(), get_cursor() as (conn, cursor):
+        if not references_valid(item, existing_references(cursor, [item], lock=True)):
+            return None, "invalid_foreign"
         cursor.execute("INSERT INTO characters (name, stat_id, class_id, weapon_id) VALUES (%s, %s, %s, %s)", (name, stat_id, class_id, weapon_id))
-        conn.commit()
-        return get_character(cursor.lastrowid), None
-    finally:
-        cursor.close()
-        conn.close()
+        trigram_search.add(cursor.lastrowid, name)
+        bump_version(conn, "characters")
+        return written_row(cursor, {"id": cursor.lastrowid, **item}, character_select() + " WHERE c.id = %s", row_character), None
 
 
 def update_character(character_id: int, name: str, stat_id: int, class_id: int, weapon_id: int) -> (Optional[Dict[str, Any]], Optional[str]):
-    if not record_exists("stats", stat_id) or not record_exists("classes", class_id) or not record_exists("weapons", weapon_id):
-        return None, "invalid_foreign"
-    conn, cursor = get_cursor()
-    try:
+    item = {"name": name, "stat_id": stat_id, "class_id": class_id, "weapon_id": weapon_id}
+    with transaction(), get_cursor() as (conn, cursor):
+        if not references_valid(item, existing_references(cursor, [item], lock=True)):
+            return None, "invalid_foreign"
         cursor.execute(
             "UPDATE characters SET name = %s, stat_id = %s, class_id = %s, weapon_id = %s WHERE id = %s",
             (name, stat_id, class_id, weapon_id, character_id),
         )
-        conn.commit()
-        if cursor.rowcount == 0:
+        changed = update_outcome(cursor, "characters", character_id)
+        if changed is None:
             return None, "not_found"
-        return get_character(character_id), None
-    finally:
-        cursor.close()
-        conn.close()
+        if changed:
+            trigram_search.add(character_id, name)
+            bump_version(conn, "characters")
+        return written_row(cursor, {"id": character_id, **item}, character_select() + " WHERE c.id = %s", row_character), None
 
 
 def delete_character(character_id: int) -> bool:
-    conn, cursor = get_cursor()
-    try:
+    with get_cursor() as (conn, cursor):
         cursor.execute("DELETE FROM characters WHERE id = %s", (character_id,))
-        conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        deleted = cursor.rowcount > 0
+        if deleted:
+            bump_version(conn, "characters")
+        commit(conn)
+        trigram_search.remove(character_id)
+        return deleted
+
+
+BULK_COLUMNS = {
+    "classes": ["name", "description"],
+    "weapons": ["name", "type", "description"],
+    "stats": ["strength", "intelligence", "dexterity", "stamina", "faith", "agility"],
+    "characters": ["name", "stat_id", "class_id", "weapon_id"],
+}
+REFERENCE_FIELDS = {"stats": "stat_id", "classes": "class_id", "weapons": "weapon_id"}
+
+
+def chunked(values: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def placeholders(count: int) -> str:
+    return ", ".join(["%s"] * count)
+
+
+def existing_ids(cursor, table: str, ids: List[int], lock: bool = False) -> set:
+    found = set()
+    for chunk in chunked(sorted(set(ids)), Config.BULK_CHUNK_SIZE):
+        query = f"SELECT id FROM {table} WHERE id IN ({placeholders(len(chunk))})"
+        cursor.execute(query + " FOR UPDATE" if lock else query, tuple(chunk))
+        found.update(row["id"] for row in cursor.fetchall())
+    return found
+
+
+def referenced_ids(cursor, table: str, ids: List[int], lock: bool = False) -> set:
+    field = REFERENCE_FIELDS[table]
+    found = set()
+    for chunk in chunked(sorted(set(ids)), Config.BULK_CHUNK_SIZE):
+        query = f"SELECT DISTINCT {field} AS id FROM characters WHERE {field} IN ({placeholders(len(chunk))})"
+        cursor.execute(query + " LOCK IN SHARE MODE" if lock else query, tuple(chunk))
+        found.update(row["id"] for row in cursor.fetchall())
+    return found
+
+
+def existing_references(cursor, items: List[Dict[str, Any]], lock: bool = False) -> Dict[str, set]:
+    found = {table: set() for table in REFERENCE_FIELDS}
+    for chunk in chunked(items, Config.BULK_CHUNK_SIZE):
+        parts = []
+        params = []
+        for table, field in REFERENCE_FIELDS.items():
+            ids = sorted({item[field] for item in chunk})
+            part = f"SELECT '{table}' AS tbl, id FROM {table} WHERE id IN ({placeholders(len(ids))})"
+            parts.append(f"({part} LOCK IN SHARE MODE)" if lock else part)
+            params.extend(ids)
+        cursor.execute(" UNION ALL ".join(parts), tuple(params))
+        for row in cursor.fetchall():
+            found[row["tbl"]].add(row["id"])
+    return found
+
+
+def references_valid(item: Dict[str, Any], found: Dict[str, set]) -> bool:
+    return all(item[field] in found[table] for table, field in REFERENCE_FIELDS.items())
+
+
+def bulk_create(table: str, items: List[Dict[str, Any]]) -> List[tuple]:
+    columns = BULK_COLUMNS[table]
+    results = [None] * len(items)
+    valid = list(range(len(items)))
+    with transaction(), get_cursor() as (conn, cursor):
+        if table == "characters":
+            found = existing_references(cursor, items, lock=True)
+            valid = []
+            for index, item in enumerate(items):
+                if references_valid(item, found):
+                    valid.append(index)
+                else:
+                    results[index] = (None, "invalid_foreign")
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders(len(columns))})"
+        for chunk in chunked(valid, Config.BULK_CHUNK_SIZE):
+            cursor.executemany(query, [tuple(items[index][col] for col in columns) for index in chunk])
+            first_id = cursor.lastrowid
+            for offset, index in enumerate(chunk):
+                results[index] = ({"id": first_id + offset, **{col: items[index][col] for col in columns}}, None)
+        if valid:
+            bump_version(conn, table)
+    if table == "characters":
+        for item, error in results:
+            if item:
+                trigram_search.add(item["id"], item["name"])
+    return results
+
+
+def bulk_update(table: str, items: List[Dict[str, Any]]) -> List[tuple]:
+    columns = BULK_COLUMNS[table]
+    results = [None] * len(items)
+    valid = []
+    with transaction(), get_cursor() as (conn, cursor):
+        found = existing_ids(cursor, table, [item["id"] for item in items])
+        references = existing_references(cursor, items, lock=True) if table == "characters" else None
+        for index, item in enumerate(items):
+            if item["id"] not in found:
+                results[index] = (None, "not_found")
+            elif references is not None and not references_valid(item, references):
+                results[index] = (None, "invalid_foreign")
+            else:
+                valid.append(index)
+        query = f"UPDATE {table} SET {', '.join(f'{col} = %s' for col in columns)} WHERE id = %s"
+        changed = 0
+        for chunk in chunked(valid, Config.BULK_CHUNK_SIZE):
+            cursor.executemany(query, [tuple(items[index][col] for col in columns) + (items[index]["id"],) for index in chunk])
+            changed += cursor.rowcount
+        for index in valid:
+            results[index] = ({"id": items[index]["id"], **{col: items[index][col] for col in columns}}, None)
+        if changed:
+            bump_version(conn, table)
+    if table == "characters":
+        for index in valid:
+            trigram_search.add(items[index]["id"], items[index]["name"])
+    return results
+
+
+def bulk_delete(table: str, ids: List[int]) -> List[tuple]:
+    with transaction(), get_cursor() as (conn, cursor):
+        # The parent rows stay locked until COMMIT, so a character cannot start referencing one between the check and the DELETE.
+        found = existing_ids(cursor, table, ids, lock=True)
+        in_use = referenced_ids(cursor, table, list(found), lock=True) if table in REFERENCE_FIELDS else set()
+        deletable = sorted(found - in_use)
+        for chunk in chunked(deletable, Config.BULK_CHUNK_SIZE):
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders(len(chunk))})", tuple(chunk))
+        if deletable:
+            bump_version(conn, table)
+    if table == "characters":
+        for record_id in deletable:
+            trigram_search.remove(record_id)
+    results = []
+    for record_id in ids:
+        if record_id not in found:
+            results.append((record_id, "not_found"))
+        elif record_id in in_use:
+            results.append((record_id, "in_use"))
+        else:
+            results.append((record_id, ""))
+    return results
@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+from . import database
+from .config import Config
+from .utils import parse_stream_format
+
+
+SKIPPED_HEADERS = {"content-length", "set-cookie"}
+log = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    blocking = False
+
+    def __init__(self, maxbytes):
+        self.maxbytes = maxbytes
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def generations(self, tables):
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def put(self, key, tables, generations, value, ttl):
+        size = len(value[2])
+        with self._lock:
+            if tuple(self._generations.get(table, 0) for table in tables) != generations:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, frozenset(tables), value)
+            self._bytes += size
+            while self._bytes > self.maxbytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            for key in [key for key, (_, tags, _) in self._entries.items() if tags & set(tables)]:
+                self._drop(key)
+
+    def _drop(self, key):
+        self._bytes -= len(self._entries.pop(key)[2][2])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "maxbytes": self.maxbytes, "evictions": self.evictions}
+
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY, tags TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL,
+    body BLOB NOT NULL, size INTEGER NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, generation INTEGER NOT NULL);
+"""
+
+
+class SharedStore:
+    # SQLite calls block, for up to the 5 second busy timeout while another worker holds the write lock.
+    blocking = True
+
+    def __init__(self, path, maxbytes):
+        self.path = path
+        self.maxbytes = maxbytes
+        self._local = threading.local()
+        self.evictions = 0
+        conn = self._connect()
+        conn.executescript(SHARED_SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    @property
+    def conn(self):
+        # SQLite handles must not cross fork(), so each process and thread opens its own.
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def get(self, key):
+        now = time.time()
+        row = self.conn.execute("SELECT status, headers, body, expires, accessed FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[3] < now:
+            return None
+        if now - row[4] > 1:
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return row[0], [tuple(header) for header in json.loads(row[1])], row[2]
+
+    def generations(self, tables):
+        found = dict(self.conn.execute(f"SELECT name, generation FROM generations WHERE name IN ({', '.join('?' * len(tables))})", tables))
+        return tuple(found.get(table, 0) for table in tables)
+
+    def put(self, key, tables, generations, value, ttl):
+        status, headers, body = value
+        now = time.time()
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            if self.generations(tables) != generations:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, "".join(f"|{table}|" for table in tables), status, json.dumps(headers), body, len(body), now + ttl, now),
+            )
+            excess = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0] - self.maxbytes
+            if excess > 0:
+                victims = []
+                for victim, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                    victims.append((victim,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                self.evictions += len(victims)
+            return True
+
+    def invalidate(self, tables):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            for table in tables:
+                conn.execute(
+                    "INSERT INTO generations VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET generation = generation + 1",
+                    (table,),
+                )
+                conn.execute("DELETE FROM responses WHERE instr(tags, ?) > 0", (f"|{table}|",))
+
+    def clear(self):
+        self.conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "maxbytes": self.maxbytes, "evictions": self.evictions}
+
+
+STORES = {
+    "memory": lambda: MemoryStore(Config.RESPONSE_CACHE_MAXBYTES),
+    "shared": lambda: SharedStore(Config.RESPONSE_CACHE_PATH, Config.RESPONSE_CACHE_MAXBYTES),
+}
+
+store = None
+counters = {"hits": 0, "misses": 0, "stored": 0, "stale": 0, "errors": 0}
+_lock = threading.Lock()
+
+
+def get_store():
+    global store
+    if store is None and Config.RESPONSE_CACHE in STORES:
+        with _lock:
+            if store is None:
+                store = STORES[Config.RESPONSE_CACHE]()
+    return store
+
+
+def count(name):
+    with _lock:
+        counters[name] += 1
+
+
+def cache_key():
+    return f"{request.path}?{urlencode(sorted(request.args.items(multi=True)))}"
+
+
+def bypass():
+    if get_store() is None or parse_stream_format(request) is not None:
+        return True
+    return bool(Config.MYSQL_REPLICA_HOSTS and database.pinned())
+
+
+def lookup(tables):
+    active = get_store()
+    key = cache_key()
+    try:
+        value = active.get(key)
+        generations = active.generations(tables) if value is None else None
+    except sqlite3.Error:
+        log.warning("Response cache lookup failed for %s", key, exc_info=True)
+        count("errors")
+        return key, None, None
+    if value is not None:
+        count("hits")
+        status, headers, body = value
+        response = current_app.response_class(body, status, headers=headers)
+        return key, None, response.make_conditional(request)
+    count("misses")
+    return key, generations, None
+
+
+def remember(key, tables, generations, response):
+    if generations is None or response.status_code != 200 or response.is_streamed:
+        return response
+    headers = [(name, value) for name, value in response.headers.items() if name.lower() not in SKIPPED_HEADERS]
+    try:
+        stored = get_store().put(key, tables, generations, (200, headers, response.get_data()), Config.RESPONSE_CACHE_TTL)
+    except sqlite3.Error:
+        log.warning("Response cache store failed for %s", key, exc_info=True)
+        count("errors")
+        return response
+    count("stored" if stored else "stale")
+    return response
+
+
+def fill_reads(generations):
+    # Misses are rendered from the primary: a lagging replica could store old rows under the new generation.
+    return database.primary_reads() if generations is not None else nullcontext()
+
+
+def response_cached(*tables):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if bypass():
+                return view(*args, **kwargs)
+            key, generations, response = lookup(tables)
+            if response is not None:
+                return response
+            with fill_reads(generations):
+                response = make_response(view(*args, **kwargs))
+            return remember(key, tables, generations, response)
+        return wrapper
+    return decorator
+
+
+def invalidate(tables):
+    active = get_store()
+    if active is None:
+        return
+    try:
+        active.invalidate(tuple(tables))
+    except Exception:
+        # This runs after the MySQL COMMIT, so a cache failure must not turn the write into a 500.
+        log.exception("Response cache invalidation failed for %s; flushing the cache", ", ".join(sorted(tables)))
+        count("errors")
+        try:
+            active.clear()
+        except Exception:
+            log.exception("Response cache flush failed")
+
+
+def response_cache_stats():
+    active = get_store()
+    with _lock:
+        result = {"backend": Config.RESPONSE_CACHE, **counters}
+    return {**result, **active.stats()} if active is not None else result
+
+
+def init_app(app):
+    if invalidate not in database.commit_hooks:
+        database.commit_hooks.append(invalidate)
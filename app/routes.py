@@ -1,4 +1,7 @@
-from flask import Blueprint, request
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import Blueprint, Response, current_app, make_response, request
 from flask_jwt_extended import create_access_token, jwt_required
 from .utils import (
     format_response,
@@ -7,35 +10,129 @@ from .utils import (
     validate_weapon_payload,
     validate_stats_payload,
     validate_character_payload,
+    parse_ids,
     parse_int,
+    parse_pagination,
+    validate_bulk_payload,
+    parse_expand,
+    parse_stream_format,
+    stream_response,
 )
 from .query import (
     list_classes,
+    iter_classes,
     get_class,
+    classes_by_ids,
     create_class,
     update_class,
     delete_class,
     list_weapons,
+    iter_weapons,
     get_weapon,
+    weapons_by_ids,
     create_weapon,
     update_weapon,
     delete_weapon,
     list_stats,
+    iter_stats,
     get_stat,
+    stats_by_ids,
     create_stat,
     update_stat,
     delete_stat,
     list_characters,
+    iter_characters,
     get_character,
+    characters_by_ids,
     create_character,
     update_character,
     delete_character,
+    bulk_create,
+    bulk_update,
+    bulk_delete,
+    explain_characters,
+    table_versions,
 )
+from .analytics import class_breakdown, stat_summary
+from .auth import token_cache
+from .cache import cache_stats, sync_versions
+from .compression import precompressed
+from .response_cache import response_cache_stats, response_cached
+from .database import PoolTimeout, pool_stats, replica_stats
+from .metrics import collect
+from .search import SEARCH_ENGINES
 from .config import Config
 
 
 api_bp = Blueprint("api", __name__)
 
+BULK_VALIDATORS = {
+    "classes": validate_class_payload,
+    "weapons": validate_weapon_payload,
+    "stats": validate_stats_payload,
+    "characters": validate_character_payload,
+}
+BULK_ERRORS = {
+    "invalid_foreign": (400, "Invalid foreign key"),
+    "not_found": (404, "Not found"),
+    "in_use": (400, "Record is referenced by characters"),
+}
+
+
+def validators(versions):
+    sync_versions({name: version for name, (version, _) in versions.items()})
+    key = repr((request.path, sorted(request.args.items(multi=True)), sorted(versions.items())))
+    etag = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    updated = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    last_modified = max(updated).replace(tzinfo=timezone.utc, microsecond=0) if updated else None
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+
+
+def set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    return response
+
+
+def conditional(*tables):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = validators(table_versions(tables))
+            if not_modified(etag, last_modified):
+                return set_validators(current_app.response_class(status=304), etag, last_modified)
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def character_filters():
+    search_mode = request.args.get("search")
+    if search_mode is not None and search_mode not in SEARCH_ENGINES:
+        return None, f"search must be one of {', '.join(SEARCH_ENGINES)}"
+    filters = {
+        "name": request.args.get("q"),
+        "search": search_mode,
+        "class_id": parse_int(request.args.get("class_id")),
+        "weapon_id": parse_int(request.args.get("weapon_id")),
+        "strength_min": parse_int(request.args.get("strength_min")),
+        "intelligence_min": parse_int(request.args.get("intelligence_min")),
+        "dexterity_min": parse_int(request.args.get("dexterity_min")),
+        "stamina_min": parse_int(request.args.get("stamina_min")),
+        "faith_min": parse_int(request.args.get("faith_min")),
+        "agility_min": parse_int(request.args.get("agility_min")),
+    }
+    return {k: v for k, v in filters.items() if v is not None}, None
+
 
 @api_bp.post("/login")
 def login():
@@ -48,16 +145,74 @@ def login():
     return {"message": "Invalid credentials"}, 401
 
 
+@api_bp.get("/cache/stats")
+@jwt_required()
+def cache_stats_route():
+    output_format = parse_format(request)
+    return format_response({"caches": cache_stats(), "responses": response_cache_stats(), "tokens": token_cache.stats()}, 200, output_format)
+
+
+@api_bp.get("/pool/stats")
+@jwt_required()
+def pool_stats_route():
+    output_format = parse_format(request)
+    return format_response({"pool": pool_stats(), "replicas": replica_stats()}, 200, output_format)
+
+
+@api_bp.errorhandler(PoolTimeout)
+def pool_timeout(error):
+    body, status, *headers = format_response({"message": "Database busy, retry shortly"}, 503, parse_format(request))
+    response = make_response(body, status, *headers)
+    response.headers["Retry-After"] = str(max(1, round(Config.MYSQL_POOL_TIMEOUT)))
+    return response
+
+
+@api_bp.get("/admin/explain")
+@jwt_required()
+def explain_route():
+    output_format = parse_format(request)
+    if not Config.EXPLAIN_ENABLED:
+        return format_response({"message": "Not found"}, 404, output_format)
+    filters, error = character_filters()
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    limit, after_id = parse_pagination(request)
+    sql, params, plan = explain_characters(filters, limit, after_id, parse_expand(request))
+    full_scans = [row["table"] for row in plan if row.get("type") == "ALL"]
+    return format_response({"query": sql, "params": params, "plan": plan, "full_scans": full_scans}, 200, output_format)
+
+
+@api_bp.get("/metrics")
+@jwt_required()
+def metrics_route():
+    return Response(collect().render(), 200, mimetype="text/plain; version=0.0.4")
+
+
 @api_bp.get("/classes")
 @jwt_required()
+@response_cached("classes")
+@conditional("classes")
+@precompressed
 def get_classes():
     output_format = parse_format(request)
-    items = list_classes()
-    return format_response({"classes": items}, 200, output_format)
+    ids, error = parse_ids(request)
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    if ids is not None:
+        items, missing = classes_by_ids(ids)
+        return format_response({"classes": items, "missing": missing}, 200, output_format)
+    limit, after_id = parse_pagination(request)
+    stream_format = parse_stream_format(request)
+    if stream_format:
+        return stream_response("classes", iter_classes(after_id), stream_format)
+    items, next_cursor = list_classes(limit, after_id)
+    return format_response({"classes": items, "next_cursor": next_cursor}, 200, output_format)
 
 
 @api_bp.get("/classes/<int:class_id>")
 @jwt_required()
+@response_cached("classes")
+@conditional("classes")
 def get_class_route(class_id):
     output_format = parse_format(request)
     item = get_class(class_id)
@@ -104,14 +259,29 @@ def delete_class_route(class_id):
 
 @api_bp.get("/weapons")
 @jwt_required()
+@response_cached("weapons")
+@conditional("weapons")
+@precompressed
 def get_weapons():
     output_format = parse_format(request)
-    items = list_weapons()
-    return format_response({"weapons": items}, 200, output_format)
+    ids, error = parse_ids(request)
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    if ids is not None:
+        items, missing = weapons_by_ids(ids)
+        return format_response({"weapons": items, "missing": missing}, 200, output_format)
+    limit, after_id = parse_pagination(request)
+    stream_format = parse_stream_format(request)
+    if stream_format:
+        return stream_response("weapons", iter_weapons(after_id), stream_format)
+    items, next_cursor = list_weapons(limit, after_id)
+    return format_response({"weapons": items, "next_cursor": next_cursor}, 200, output_format)
 
 
 @api_bp.get("/weapons/<int:weapon_id>")
 @jwt_required()
+@response_cached("weapons")
+@conditional("weapons")
 def get_weapon_route(weapon_id):
     output_format = parse_format(request)
     item = get_weapon(weapon_id)
@@ -158,14 +328,56 @@ def delete_weapon_route(weapon_id):
 
 @api_bp.get("/stats")
 @jwt_required()
+@response_cached("stats")
+@conditional("stats")
+@precompressed
 def get_stats_route():
     output_format = parse_format(request)
-    items = list_stats()
-    return format_response({"stats": items}, 200, output_format)
+    ids, error = parse_ids(request)
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    if ids is not None:
+        items, missing = stats_by_ids(ids)
+        return format_response({"stats": items, "missing": missing}, 200, output_format)
+    limit, after_id = parse_pagination(request)
+    stream_format = parse_stream_format(request)
+    if stream_format:
+        return stream_response("stats", iter_stats(after_id), stream_format)
+    items, next_cursor = list_stats(limit, after_id)
+    return format_response({"stats": items, "next_cursor": next_cursor}, 200, output_format)
+
+
+@api_bp.get("/stats/summary")
+@jwt_required()
+@response_cached("characters", "stats")
+@conditional("characters", "stats")
+def stats_summary_route():
+    output_format = parse_format(request)
+    filters, error = character_filters()
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    bucket = parse_int(request.args.get("bucket", "10"))
+    if bucket is None or not 1 <= bucket <= 100:
+        return format_response({"message": "bucket must be between 1 and 100"}, 400, output_format)
+    return format_response(stat_summary(filters, bucket), 200, output_format)
+
+
+@api_bp.get("/stats/by-class")
+@jwt_required()
+@response_cached("characters", "stats")
+@conditional("characters", "stats")
+def stats_by_class_route():
+    output_format = parse_format(request)
+    filters, error = character_filters()
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    return format_response({"classes": class_breakdown(filters)}, 200, output_format)
 
 
 @api_bp.get("/stats/<int:stat_id>")
 @jwt_required()
+@response_cached("stats")
+@conditional("stats")
 def get_stat_route(stat_id):
     output_format = parse_format(request)
     item = get_stat(stat_id)
@@ -212,29 +424,35 @@ def delete_stat_route(stat_id):
 
 @api_bp.get("/characters")
 @jwt_required()
+@response_cached("characters", "stats", "classes", "weapons")
+@conditional("characters", "stats", "classes", "weapons")
 def get_characters_route():
     output_format = parse_format(request)
-    filters = {
-        "name": request.args.get("q"),
-        "class_id": parse_int(request.args.get("class_id")),
-        "weapon_id": parse_int(request.args.get("weapon_id")),
-        "strength_min": parse_int(request.args.get("strength_min")),
-        "intelligence_min": parse_int(request.args.get("intelligence_min")),
-        "dexterity_min": parse_int(request.args.get("dexterity_min")),
-        "stamina_min": parse_int(request.args.get("stamina_min")),
-        "faith_min": parse_int(request.args.get("faith_min")),
-        "agility_min": parse_int(request.args.get("agility_min")),
-    }
-    filters = {k: v for k, v in filters.items() if v is not None}
-    items = list_characters(filters)
-    return format_response({"characters": items}, 200, output_format)
+    ids, error = parse_ids(request)
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    expand = parse_expand(request)
+    if ids is not None:
+        items, missing = characters_by_ids(ids, expand)
+        return format_response({"characters": items, "missing": missing}, 200, output_format)
+    filters, error = character_filters()
+    if error:
+        return format_response({"message": error}, 400, output_format)
+    limit, after_id = parse_pagination(request)
+    stream_format = parse_stream_format(request)
+    if stream_format:
+        return stream_response("characters", iter_characters(filters, after_id, expand), stream_format)
+    items, next_cursor = list_characters(filters, limit, after_id, expand)
+    return format_response({"characters": items, "next_cursor": next_cursor}, 200, output_format)
 
 
 @api_bp.get("/characters/<int:character_id>")
 @jwt_required()
+@response_cached("characters", "stats", "classes", "weapons")
+@conditional("characters", "stats", "classes", "weapons")
 def get_character_route(character_id):
     output_format = parse_format(request)
-    item = get_character(character_id)
+    item = get_character(character_id, parse_expand(request))
     if not item:
         return format_response({"message": "Not found"}, 404, output_format)
     return format_response(item, 200, output_format)
@@ -275,4 +493,75 @@ def delete_character_route(character_id):
     success = delete_character(character_id)
     if not success:
         return format_response({"message": "Not found"}, 404, output_format)
-    return format_response({"deleted": True}, 200, output_format)
\ No newline at end of file
+    return format_response({"deleted": True}, 200, output_format)
+
+
+def bulk_result(key, value, error, status, **fields):
+    if error:
+        error_status, message = BULK_ERRORS[error]
+        return {key: value, "status": error_status, "message": message}
+    return {key: value, "status": status, **fields}
+
+
+def bulk_response(results, output_format):
+    failed = sum(1 for result in results if result["status"] >= 400)
+    return format_response({"results": results, "succeeded": len(results) - failed, "failed": failed}, 200, output_format)
+
+
+@api_bp.post("/<any(classes, weapons, stats, characters):resource>/bulk")
+@jwt_required()
+def bulk_create_route(resource):
+    output_format = parse_format(request)
+    is_valid, payload = validate_bulk_payload(request.get_json(silent=True))
+    if not is_valid:
+        return format_response({"message": payload}, 400, output_format)
+    results = [None] * len(payload)
+    valid = []
+    for index, raw in enumerate(payload):
+        is_valid, result = BULK_VALIDATORS[resource](raw)
+        if is_valid:
+            valid.append((index, result))
+        else:
+            results[index] = {"index": index, "status": 400, "message": result}
+    written = bulk_create(resource, [item for _, item in valid]) if valid else []
+    for (index, _), (item, error) in zip(valid, written):
+        results[index] = bulk_result("index", index, error, 201, item=item)
+    return bulk_response(results, output_format)
+
+
+@api_bp.put("/<any(classes, weapons, stats, characters):resource>/bulk")
+@jwt_required()
+def bulk_update_route(resource):
+    output_format = parse_format(request)
+    is_valid, payload = validate_bulk_payload(request.get_json(silent=True))
+    if not is_valid:
+        return format_response({"message": payload}, 400, output_format)
+    results = [None] * len(payload)
+    valid = []
+    for index, raw in enumerate(payload):
+        record_id = parse_int(raw.get("id")) if isinstance(raw, dict) else None
+        is_valid, result = BULK_VALIDATORS[resource](raw)
+        if record_id is None:
+            results[index] = {"index": index, "status": 400, "message": "id is required"}
+        elif not is_valid:
+            results[index] = {"index": index, "status": 400, "message": result}
+        else:
+            valid.append((index, {"id": record_id, **result}))
+    written = bulk_update(resource, [item for _, item in valid]) if valid else []
+    for (index, _), (item, error) in zip(valid, written):
+        results[index] = bulk_result("index", index, error, 200, item=item)
+    return bulk_response(results, output_format)
+
+
+@api_bp.delete("/<any(classes, weapons, stats, characters):resource>/bulk")
+@jwt_required()
+def bulk_delete_route(resource):
+    output_format = parse_format(request)
+    is_valid, payload = validate_bulk_payload(request.get_json(silent=True), "ids")
+    if not is_valid:
+        return format_response({"message": payload}, 400, output_format)
+    ids = [parse_int(value) for value in payload]
+    if any(record_id is None for record_id in ids):
+        return format_response({"message": "ids must be integers"}, 400, output_format)
+    results = [bulk_result("id", record_id, error, 200, deleted=True) for record_id, error in bulk_delete(resource, ids)]
+    return bulk_response(results, output_format)
@@ -0,0 +1,35 @@
+from dataclasses import make_dataclass
+from operator import itemgetter
+from typing import Any, Iterator, Tuple
+
+
+class Record:
+    __slots__ = ()
+    columns: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.columns
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((column, getattr(self, column)) for column in self.columns)
+
+
+def record_type(name: str, columns: Tuple[str, ...]) -> type:
+    # Fields are declared in sorted order so native encoders emit the same key order as the
+    # sorted dict path; `columns` keeps the SELECT order for XML and dict(record).
+    fields = sorted(columns)
+    cls = make_dataclass(name, fields, bases=(Record,), slots=True)
+    cls.columns = tuple(columns)
+    reorder = itemgetter(*[columns.index(field) for field in fields])
+    cls.from_row = staticmethod(lambda row: cls(*reorder(row)))
+    return cls
+
+
+STAT_COLUMNS = ("id", "strength", "intelligence", "dexterity", "stamina", "faith", "agility")
+CHARACTER_COLUMNS = ("id", "name", "stat_id", "class_id", "weapon_id")
+
+StatRecord = record_type("StatRecord", STAT_COLUMNS)
+CharacterRecord = record_type("CharacterRecord", CHARACTER_COLUMNS)
@@ -0,0 +1,145 @@
+import re
+import threading
+from typing import Dict, List, Optional
+from .config import Config
+from .database import get_cursor
+
+
+VERSION_SELECT = "SELECT name, version FROM table_versions WHERE name IN (%s)"
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ContainsSearch:
+    rank = 4
+
+    def condition(self, column: str, term: str) -> (str, List):
+        return f"{column} LIKE %s", [f"%{escape_like(term)}%"]
+
+
+class PrefixSearch:
+    rank = 3
+
+    def condition(self, column: str, term: str) -> (str, List):
+        return f"{column} LIKE %s", [f"{escape_like(term)}%"]
+
+
+class FulltextSearch:
+    rank = 0
+
+    def condition(self, column: str, term: str) -> (str, List):
+        words = re.sub(r'[+\-<>()~*"@]', " ", term).split()
+        if not words:
+            return ContainsSearch().condition(column, term)
+        return f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)", [" ".join(f"+{word}*" for word in words)]
+
+
+class TrigramSearch:
+    rank = 0
+
+    def __init__(self):
+        self.names: Optional[Dict[int, str]] = None
+        self.index: Dict[str, set] = {}
+        self.version: Optional[int] = None
+        self.builder: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def current_version(self, read: bool = False) -> Optional[int]:
+        with get_cursor(read=read) as (conn, cursor):
+            cursor.execute(VERSION_SELECT, ("characters",))
+            row = cursor.fetchone()
+        return row["version"] if row else None
+
+    def build(self):
+        names = {}
+        index = {}
+        # The version is read first, so a write that lands during the scan triggers another rebuild.
+        version = self.current_version()
+        with get_cursor() as (conn, cursor):
+            cursor.execute("SELECT id, name FROM characters")
+            while True:
+                rows = cursor.fetchmany(Config.STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    names[row["id"]] = row["name"].lower()
+                    for gram in trigrams(row["name"]):
+                        index.setdefault(gram, set()).add(row["id"])
+        with self._lock:
+            self.names = names
+            self.index = index
+            self.version = version
+
+    def refresh(self):
+        # Writes handled by other workers only show up as a newer characters version; rebuild off the request path.
+        if self.names is not None and (self.current_version(read=True) or 0) <= (self.version or 0):
+            return
+        with self._lock:
+            if self.builder is not None and self.builder.is_alive():
+                return
+            self.builder = threading.Thread(target=self.build, name="trigram-build", daemon=True)
+            self.builder.start()
+
+    def add(self, record_id: int, name: str):
+        with self._lock:
+            if self.names is None:
+                return
+            self._remove(record_id)
+            self.names[record_id] = name.lower()
+            for gram in trigrams(name):
+                self.index.setdefault(gram, set()).add(record_id)
+
+    def remove(self, record_id: int):
+        with self._lock:
+            if self.names is not None:
+                self._remove(record_id)
+
+    def _remove(self, record_id: int):
+        name = self.names.pop(record_id, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            ids = self.index.get(gram)
+            if ids is not None:
+                ids.discard(record_id)
+
+    def search(self, term: str) -> Optional[List[int]]:
+        needle = term.lower()
+        grams = {gram for gram in trigrams(needle) if gram.strip() and len(gram.strip()) == 3}
+        with self._lock:
+            if self.names is None or not grams:
+                return None
+            candidates = set.intersection(*sorted((self.index.get(gram, set()) for gram in grams), key=len))
+            ids = sorted(record_id for record_id in candidates if needle in self.names[record_id])
+        return ids if len(ids) <= Config.TRIGRAM_MAX_IDS else None
+
+    def condition(self, column: str, term: str) -> (str, List):
+        self.refresh()
+        ids = self.search(term)
+        if ids is None:
+            # Index still building, term shorter than a trigram, or too many matches for an IN list.
+            return ContainsSearch().condition(column, term)
+        if not ids:
+            return "1 = 0", []
+        id_column = column.rsplit(".", 1)[0] + ".id" if "." in column else "id"
+        return f"{id_column} IN ({', '.join(['%s'] * len(ids))})", ids
+
+
+trigram_search = TrigramSearch()
+SEARCH_ENGINES = {
+    "contains": ContainsSearch(),
+    "prefix": PrefixSearch(),
+    "fulltext": FulltextSearch(),
+    "trigram": trigram_search,
+}
+
+
+def get_search_engine(mode: Optional[str] = None):
+    return SEARCH_ENGINES[mode or Config.SEARCH_MODE]
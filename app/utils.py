@@ -1,5 +1,8 @@
-import xml.etree.ElementTree as ET
-from flask import jsonify
+from flask import Response, jsonify, stream_with_context
+from .config import Config
+from .json_provider import dumps_row
+from .metrics import timed
+from .rows import Record
 
 
 def parse_int(value):
@@ -63,51 +66,159 @@ def validate_character_payload(payload):
     return True, {"name": name.strip(), "stat_id": stat_id, "class_id": class_id, "weapon_id": weapon_id}
 
 
-def dict_to_xml(tag, data):
-    elem = ET.Element(tag)
-
-    def build(parent, key, val):
-        if isinstance(val, list):
-            list_elem = ET.SubElement(parent, key)
-            for item in val:
-                item_elem = ET.SubElement(list_elem, "item")
-                if isinstance(item, dict):
-                    for k, v in item.items():
-                        build(item_elem, k, v)
-                else:
-                    item_elem.text = "" if item is None else str(item)
-        elif isinstance(val, dict):
-            child = ET.SubElement(parent, key)
-            for k, v in val.items():
-                build(child, k, v)
+def validate_bulk_payload(payload, key="items"):
+    if isinstance(payload, dict):
+        payload = payload.get(key)
+    if not isinstance(payload, list) or not payload:
+        return False, f"{key} must be a non-empty list"
+    if len(payload) > Config.BULK_MAX_ITEMS:
+        return False, f"At most {Config.BULK_MAX_ITEMS} {key} per request"
+    return True, payload
+
+
+def xml_text(value):
+    if value is None:
+        return ""
+    if type(value) is int:
+        return str(value)
+    text = value if type(value) is str else str(value)
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def xml_scalar(parts, tag, value):
+    text = xml_text(value)
+    parts.append(f"<{tag}>{text}</{tag}>" if text else f"<{tag} />")
+
+
+def xml_row(parts, row):
+    if not row:
+        parts.append("<item />")
+        return
+    parts.append("<item>")
+    for key, value in row.items():
+        if isinstance(value, (dict, list)):
+            xml_element(parts, key, value)
         else:
-            child = ET.SubElement(parent, key)
-            child.text = "" if val is None else str(val)
-
-    if isinstance(data, dict):
-        for k, v in data.items():
-            build(elem, k, v)
-    elif isinstance(data, list):
-        for item in data:
-            item_elem = ET.SubElement(elem, "item")
-            if isinstance(item, dict):
-                for k, v in item.items():
-                    build(item_elem, k, v)
+            xml_scalar(parts, key, value)
+    parts.append("</item>")
+
+
+def xml_element(parts, tag, value):
+    if isinstance(value, list):
+        if not value:
+            parts.append(f"<{tag} />")
+            return
+        parts.append(f"<{tag}>")
+        for item in value:
+            if isinstance(item, (dict, Record)):
+                xml_row(parts, item)
             else:
-                item_elem.text = "" if item is None else str(item)
+                xml_scalar(parts, "item", item)
+        parts.append(f"</{tag}>")
+    elif isinstance(value, dict):
+        if not value:
+            parts.append(f"<{tag} />")
+            return
+        parts.append(f"<{tag}>")
+        for key, child in value.items():
+            if isinstance(child, (dict, list)):
+                xml_element(parts, key, child)
+            else:
+                xml_scalar(parts, key, child)
+        parts.append(f"</{tag}>")
     else:
-        elem.text = "" if data is None else str(data)
-    return elem
+        xml_scalar(parts, tag, value)
+
+
+def encode_xml(tag, data):
+    parts = []
+    xml_element(parts, tag, data)
+    return "".join(parts).encode("utf-8", "xmlcharrefreplace")
 
 
 def format_response(data, status=200, output_format="json"):
-    if output_format == "xml":
-        root = dict_to_xml("response", data if isinstance(data, (dict, list)) else {"data": data})
-        xml_str = ET.tostring(root, encoding="utf-8")
-        return xml_str, status, {"Content-Type": "application/xml"}
-    return jsonify(data), status
+    with timed("serialize", "api_serialize_duration_seconds", format=output_format):
+        if output_format == "xml":
+            body = encode_xml("response", data if isinstance(data, (dict, list)) else {"data": data})
+            return body, status, {"Content-Type": "application/xml"}
+        return jsonify(data), status
 
 
 def parse_format(request):
     fmt = request.args.get("format", "json").lower()
-    return "xml" if fmt == "xml" else "json"
\ No newline at end of file
+    return "xml" if fmt == "xml" else "json"
+
+
+def parse_stream_format(request):
+    fmt = request.args.get("format", "json").lower()
+    if fmt == "ndjson":
+        return "ndjson"
+    if request.args.get("stream", "").lower() not in ("1", "true", "yes"):
+        return None
+    return "xml" if fmt == "xml" else "json"
+
+
+def xml_stream_row(row):
+    parts = []
+    xml_row(parts, row)
+    return "".join(parts)
+
+
+def stream_parts(key, output_format="json"):
+    # The head is sent with the first row, so an empty result can be written as a whole document like encode_xml's "<key />".
+    if output_format == "xml":
+        return "<response><%s>" % key, xml_stream_row, "", "</%s></response>" % key, "<response><%s /></response>" % key, "application/xml"
+    if output_format == "ndjson":
+        return "", lambda row: dumps_row(row) + "\n", "", "", "", "application/x-ndjson"
+    return '{"%s":[' % key, dumps_row, ",", "]}", '{"%s":[]}' % key, "application/json"
+
+
+def encode_stream(key, rows, output_format="json"):
+    head, encode_row, separator, tail, empty, _ = stream_parts(key, output_format)
+    first = True
+    for row in rows:
+        yield head + encode_row(row) if first else separator + encode_row(row)
+        first = False
+    ending = empty if first else tail
+    if ending:
+        yield ending
+
+
+def stream_response(key, rows, output_format="json"):
+    mimetype = stream_parts(key, output_format)[5]
+    return Response(stream_with_context(encode_stream(key, rows, output_format)), 200, mimetype=mimetype)
+
+
+def parse_expand(request, allowed=("stats", "class", "weapon")):
+    requested = {name.strip().lower() for name in request.args.get("expand", "").split(",")}
+    return tuple(name for name in allowed if name in requested)
+
+
+def parse_ids(request):
+    raw = request.args.get("ids")
+    if raw is None:
+        return None, None
+    ids = [parse_int(part.strip()) for part in raw.split(",")]
+    if not ids or any(record_id is None or record_id <= 0 for record_id in ids):
+        return None, "ids must be a comma-separated list of positive integers"
+    ids = tuple(dict.fromkeys(ids))
+    if len(ids) > Config.MULTI_GET_MAX_IDS:
+        return None, f"At most {Config.MULTI_GET_MAX_IDS} ids per request"
+    return ids, None
+
+
+def parse_pagination(request):
+    limit = parse_int(request.args.get("limit"))
+    after_id = parse_int(request.args.get("after_id"))
+    if limit is None or limit <= 0:
+        limit = Config.PAGE_SIZE_DEFAULT
+    limit = min(limit, Config.PAGE_SIZE_MAX)
+    if after_id is not None and after_id < 0:
+        after_id = None
+    return limit, after_id
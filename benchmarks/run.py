@@ -0,0 +1,239 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, database, query
+from app.cache import invalidate
+from app.config import Config
+from app.utils import format_response
+from benchmarks.standin import StandinPool
+
+
+ROUTES = [
+    ("GET /api/classes", "get", "/api/classes", None),
+    ("GET /api/classes?format=xml", "get", "/api/classes?format=xml", None),
+    ("GET /api/characters?limit=100", "get", "/api/characters?limit=100", None),
+    ("GET /api/characters?limit=100&format=xml", "get", "/api/characters?limit=100&format=xml", None),
+    ("GET /api/characters?limit=100&expand=stats,class,weapon", "get", "/api/characters?limit=100&expand=stats,class,weapon", None),
+    ("GET /api/characters?q=Hero 00001&search=prefix", "get", "/api/characters?q=Hero%2000001&search=prefix", None),
+    ("GET /api/characters?strength_min=50&class_id=3", "get", "/api/characters?strength_min=50&class_id=3", None),
+    ("GET /api/characters/1", "get", "/api/characters/1", None),
+    ("POST /api/characters", "post", "/api/characters", {"name": "Bench", "stat_id": 1, "class_id": 1, "weapon_id": 1}),
+]
+
+QUERIES = [
+    ("list_classes(limit=100)", lambda: query.list_classes(100)),
+    ("get_class(1) cold", lambda: (invalidate("classes"), query.get_class(1))),
+    ("get_class(1) warm", lambda: query.get_class(1)),
+    ("list_stats(limit=1000)", lambda: query.list_stats(1000)),
+    ("list_characters(limit=100)", lambda: query.list_characters({}, 100)),
+    ("list_characters(limit=1000)", lambda: query.list_characters({}, 1000)),
+    ("list_characters(limit=100, expand=all)", lambda: query.list_characters({}, 100, None, ("stats", "class", "weapon"))),
+    ("list_characters(strength_min=50)", lambda: query.list_characters({"strength_min": 50}, 100)),
+    ("get_character(1)", lambda: query.get_character(1)),
+    ("create_character", lambda: query.create_character("Bench", 1, 1, 1)),
+]
+
+
+def etree_xml(data, tag="response"):
+    def build(parent, key, val):
+        child = ET.SubElement(parent, key)
+        fill(child, val)
+
+    def fill(elem, val):
+        if isinstance(val, list):
+            for item in val:
+                item_elem = ET.SubElement(elem, "item")
+                if isinstance(item, dict):
+                    fill(item_elem, item)
+                else:
+                    item_elem.text = "" if item is None else str(item)
+        elif isinstance(val, dict):
+            for k, v in val.items():
+                build(elem, k, v)
+        else:
+            elem.text = "" if val is None else str(val)
+
+    root = ET.Element(tag)
+    fill(root, data)
+    return ET.tostring(root, encoding="utf-8")
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 4)
+
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "ops_per_s": round(len(samples) / sum(samples), 2) if sum(samples) else None,
+    }
+
+
+def measure(func, iterations, warmup=3):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_routes(app, iterations):
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": Config.API_USER, "password": Config.API_PASSWORD}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    results = {}
+    for name, method, url, body in ROUTES:
+        def call():
+            resp = getattr(client, method)(url, json=body, headers=headers)
+            if resp.status_code >= 400:
+                raise RuntimeError(f"{name} returned {resp.status_code}")
+        results[name] = measure(call, iterations)
+    return results
+
+
+def bench_queries(app, iterations):
+    results = {}
+    for name, func in QUERIES:
+        def call():
+            with app.app_context():
+                func()
+        results[name] = measure(call, iterations)
+    return results
+
+
+def bench_serialization(app, sizes, iterations):
+    results = {}
+    for size in sizes:
+        rows = [{"id": i, "name": f"Hero {i:07d}", "stat_id": i, "class_id": i % 20 + 1, "weapon_id": i % 50 + 1} for i in range(1, size + 1)]
+        repeat = max(1, iterations * 1000 // size)
+        for output_format in ("json", "xml"):
+            with app.test_request_context():
+                def call():
+                    response = format_response({"characters": rows}, 200, output_format)[0]
+                    return response if isinstance(response, bytes) else response.get_data()
+                result = measure(call, repeat, warmup=1)
+                result["bytes"] = len(call())
+            results[f"format_response {output_format} {size} rows"] = result
+        baseline = measure(lambda: etree_xml({"characters": rows}), repeat, warmup=1)
+        baseline["bytes"] = len(etree_xml({"characters": rows}))
+        results[f"etree xml baseline {size} rows"] = baseline
+    return results
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(app):
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": Config.API_USER, "password": Config.API_PASSWORD}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    cases = [
+        ("list_stats(limit=1000)", lambda: query.list_stats(1000)),
+        ("list_characters(limit=1000)", lambda: query.list_characters({}, 1000)),
+    ]
+    results = {}
+    compact = Config.COMPACT_ROWS
+    try:
+        for mode in (False, True):
+            Config.COMPACT_ROWS = mode
+            label = "compact" if mode else "dict"
+            for name, func in cases:
+                def call():
+                    invalidate()
+                    with app.app_context():
+                        func()
+                results[f"{name} {label}"] = {"peak_kb": round(peak_memory(call) / 1024, 1)}
+            results[f"GET /api/characters?limit=1000 {label}"] = {
+                "peak_kb": round(peak_memory(lambda: client.get("/api/characters?limit=1000", headers=headers)) / 1024, 1)
+            }
+    finally:
+        Config.COMPACT_ROWS = compact
+    return results
+
+
+def compare(current, baseline):
+    lines = []
+    for section in ("routes", "queries", "serialization"):
+        for name, result in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if not before or not before.get("p50_ms"):
+                continue
+            change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            lines.append(f"{section:13} {name:60} p50 {before['p50_ms']:10.3f} -> {result['p50_ms']:10.3f} ms ({change:+.1f}%)")
+    return "\n".join(lines)
+
+
+def run(characters=10000, iterations=200, sizes=(1000, 100000), sections=("routes", "queries", "serialization", "memory")):
+    database.pool = StandinPool().seed(characters=characters)
+    invalidate()
+    app = create_app()
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "characters": characters,
+            "iterations": iterations,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+    }
+    if "routes" in sections:
+        report["routes"] = bench_routes(app, iterations)
+    if "queries" in sections:
+        report["queries"] = bench_queries(app, iterations)
+    if "serialization" in sections:
+        report["serialization"] = bench_serialization(app, sizes, iterations)
+    if "memory" in sections:
+        report["memory"] = bench_memory(app)
+    database.pool = None
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API, query layer and serializers against a SQLite stand-in.")
+    parser.add_argument("--characters", type=int, default=10000, help="characters seeded into the stand-in database")
+    parser.add_argument("--iterations", type=int, default=200, help="timed iterations per route/query")
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated row counts for serialization benchmarks")
+    parser.add_argument("--sections", default="routes,queries,serialization,memory")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to diff p50 latencies against")
+    args = parser.parse_args(argv)
+    report = run(
+        characters=args.characters,
+        iterations=args.iterations,
+        sizes=[int(size) for size in args.sizes.split(",") if size],
+        sections=args.sections.split(","),
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        print(compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8"))), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
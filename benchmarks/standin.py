@@ -0,0 +1,142 @@
+import random
+import re
+import sqlite3
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classes (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, description TEXT NOT NULL DEFAULT '');
+CREATE TABLE IF NOT EXISTS weapons (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, type TEXT NOT NULL, description TEXT NOT NULL DEFAULT '');
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    strength INTEGER NOT NULL, intelligence INTEGER NOT NULL, dexterity INTEGER NOT NULL,
+    stamina INTEGER NOT NULL, faith INTEGER NOT NULL, agility INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    stat_id INTEGER NOT NULL REFERENCES stats (id),
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    weapon_id INTEGER NOT NULL REFERENCES weapons (id)
+);
+CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0, updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP);
+CREATE INDEX IF NOT EXISTS idx_characters_class ON characters (class_id);
+CREATE INDEX IF NOT EXISTS idx_characters_class_weapon ON characters (class_id, weapon_id);
+CREATE INDEX IF NOT EXISTS idx_characters_weapon ON characters (weapon_id);
+CREATE INDEX IF NOT EXISTS idx_characters_stat ON characters (stat_id);
+CREATE INDEX IF NOT EXISTS idx_stats_strength ON stats (strength);
+CREATE INDEX IF NOT EXISTS idx_stats_intelligence ON stats (intelligence);
+CREATE INDEX IF NOT EXISTS idx_stats_dexterity ON stats (dexterity);
+CREATE INDEX IF NOT EXISTS idx_stats_stamina ON stats (stamina);
+CREATE INDEX IF NOT EXISTS idx_stats_faith ON stats (faith);
+CREATE INDEX IF NOT EXISTS idx_stats_agility ON stats (agility);
+INSERT OR IGNORE INTO table_versions (name) VALUES ('classes'), ('weapons'), ('stats'), ('characters');
+"""
+
+LOCKED_SELECT = re.compile(r"\((SELECT .*?) LOCK IN SHARE MODE\)")
+
+
+def translate(sql):
+    sql = LOCKED_SELECT.sub(r"\1", sql)
+    sql = sql.replace(" FOR UPDATE", "").replace(" LOCK IN SHARE MODE", "")
+    if sql.startswith("EXPLAIN "):
+        sql = "EXPLAIN QUERY PLAN " + sql[len("EXPLAIN "):]
+    return sql.replace("%s", "?")
+
+
+class StandinCursor:
+    def __init__(self, conn, dictionary=True):
+        self._cursor = conn.raw.cursor()
+        self.dictionary = dictionary
+        self.lastrowid = None
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip([col[0] for col in self._cursor.description], row))
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(translate(sql), tuple(params))
+        self.lastrowid = self._cursor.lastrowid
+
+    def executemany(self, sql, seq_params):
+        first_id = None
+        if sql.startswith("INSERT INTO"):
+            self._cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {sql.split()[2]}")
+            first_id = self._cursor.fetchone()[0]
+        self._cursor.executemany(translate(sql), list(seq_params))
+        self.lastrowid = first_id
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandinConnection:
+    def __init__(self, pool, raw):
+        self.pool = pool
+        self.raw = raw
+
+    def cursor(self, dictionary=True, buffered=None):
+        return StandinCursor(self, dictionary)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.rollback()
+        self.pool.release(self.raw)
+
+
+class StandinPool:
+    def __init__(self, path=":memory:", size=5):
+        uri = f"file:standin_{id(self)}?mode=memory&cache=shared" if path == ":memory:" else path
+        self._keepalive = sqlite3.connect(uri, uri=path == ":memory:", check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._keepalive.executescript(SCHEMA)
+        self._idle = [sqlite3.connect(uri, uri=path == ":memory:", check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES) for _ in range(size)]
+        self._lock = threading.Lock()
+        self.checkouts = 0
+
+    def get_connection(self):
+        with self._lock:
+            raw = self._idle.pop() if self._idle else None
+            self.checkouts += 1
+        if raw is None:
+            raise RuntimeError("Failed getting connection; pool exhausted")
+        return StandinConnection(self, raw)
+
+    def release(self, raw):
+        with self._lock:
+            self._idle.append(raw)
+
+    def seed(self, characters=1000, classes=20, weapons=50, stats=None, rng=None):
+        rng = rng or random.Random(42)
+        stats = stats or characters
+        db = self._keepalive
+        db.executemany("INSERT INTO classes (name, description) VALUES (?, ?)", [(f"Class {i}", f"Class {i} description") for i in range(classes)])
+        db.executemany("INSERT INTO weapons (name, type, description) VALUES (?, ?, ?)", [(f"Weapon {i}", rng.choice(["Melee", "Ranged", "Magic"]), "") for i in range(weapons)])
+        db.executemany(
+            "INSERT INTO stats (strength, intelligence, dexterity, stamina, faith, agility) VALUES (?, ?, ?, ?, ?, ?)",
+            [tuple(rng.randint(1, 99) for _ in range(6)) for _ in range(stats)],
+        )
+        db.executemany(
+            "INSERT INTO characters (name, stat_id, class_id, weapon_id) VALUES (?, ?, ?, ?)",
+            [(f"Hero {i:07d}", rng.randint(1, stats), rng.randint(1, classes), rng.randint(1, weapons)) for i in range(characters)],
+        )
+        db.commit()
+        return self
@@ -0,0 +1,45 @@
+import os
+from app.config import Config
+
+
+wsgi_app = os.environ.get("WEB_APP", "app.app:app")
+bind = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gthread")
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", "30"))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("WEB_KEEPALIVE", "5"))
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.environ.get("WEB_ACCESS_LOG", "-")
+
+
+def when_ready(server):
+    server.log.info(
+        "%s workers x %s threads, MYSQL_POOL_SIZE=%s + MYSQL_POOL_OVERFLOW=%s per worker (%s MySQL connections at most)",
+        workers, threads, Config.MYSQL_POOL_SIZE, Config.MYSQL_POOL_OVERFLOW,
+        workers * (Config.MYSQL_POOL_SIZE + Config.MYSQL_POOL_OVERFLOW),
+    )
+
+
+def on_starting(server):
+    from app import metrics
+
+    metrics.clear_exports()
+
+
+def post_fork(server, worker):
+    # Database pools are reset by os.register_at_fork in app/database.py.
+    from app import metrics, search
+
+    metrics.metrics.reset()
+    if Config.SEARCH_MODE == "trigram":
+        search.trigram_search.refresh()
+
+
+def worker_exit(server, worker):
+    from app import metrics
+
+    metrics.export(force=True)
@@ -0,0 +1,5 @@
+-- B-tree index used by ?search=prefix (c.name LIKE 'term%').
+CREATE INDEX idx_characters_name ON characters (name);
+
+-- Full-text index used by ?search=fulltext (MATCH(c.name) AGAINST ...).
+CREATE FULLTEXT INDEX ft_characters_name ON characters (name);
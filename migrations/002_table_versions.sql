@@ -0,0 +1,8 @@
+-- Per-table change counters bumped by every write in app/query.py; GET routes derive ETag/Last-Modified from them.
+CREATE TABLE table_versions (
+    name VARCHAR(64) NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO table_versions (name) VALUES ('classes'), ('weapons'), ('stats'), ('characters');
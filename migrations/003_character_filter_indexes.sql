@@ -0,0 +1,18 @@
+-- Indexes behind the character filter planner in app/query.py (check with GET /api/admin/explain).
+-- InnoDB appends the primary key to every secondary index, so equality on all of an index's columns
+-- also serves ORDER BY c.id and the after_id keyset predicate without a filesort. That is why class_id
+-- gets its own index next to the composite one.
+CREATE INDEX idx_characters_class ON characters (class_id);
+CREATE INDEX idx_characters_class_weapon ON characters (class_id, weapon_id);
+CREATE INDEX idx_characters_weapon ON characters (weapon_id);
+
+-- Semi-join from the stat *_min filters and the reference checks on stat deletes.
+CREATE INDEX idx_characters_stat ON characters (stat_id);
+
+-- Range lookups for *_min filters; the appended primary key makes them covering for the EXISTS probe.
+CREATE INDEX idx_stats_strength ON stats (strength);
+CREATE INDEX idx_stats_intelligence ON stats (intelligence);
+CREATE INDEX idx_stats_dexterity ON stats (dexterity);
+CREATE INDEX idx_stats_stamina ON stats (stamina);
+CREATE INDEX idx_stats_faith ON stats (faith);
+CREATE INDEX idx_stats_agility ON stats (agility);
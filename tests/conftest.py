@@ -0,0 +1,111 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app import cache, database
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = None
+        self.rowcount = 0
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.conn.executed.append((sql, params))
+        if self.conn.pool.responder is not None:
+            self.rows = self.conn.pool.responder(sql, params)
+            self.lastrowid = 7
+            self.rowcount = 1
+        elif sql.startswith("SELECT name, version"):
+            self.rows = [{"name": name, "version": self.conn.pool.versions.get(name, 0), "updated_at": datetime(2024, 1, 1)} for name in params]
+        elif sql.startswith("SELECT EXISTS"):
+            self.rows = [{"in_use": 0}]
+        elif sql.startswith("SELECT") and self.conn.pool.rows is not None:
+            self.rows = list(self.conn.pool.rows)
+        elif sql.startswith("SELECT"):
+            self.rows = [{"id": params[0] if params else 1, "name": "Knight", "description": "Heavy"}]
+        else:
+            self.lastrowid = 7
+            self.rowcount = self.conn.pool.rowcount
+
+    def executemany(self, sql, seq_params):
+        self.conn.executed.append((sql, list(seq_params)))
+        self.lastrowid = 100
+        self.rowcount = len(seq_params)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchmany(self, size=1):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, dictionary=True, buffered=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.pool.released += 1
+
+
+class FakePool:
+    def __init__(self):
+        self.checkouts = 0
+        self.released = 0
+        self.connections = []
+        self.rows = None
+        self.responder = None
+        self.versions = {}
+        self.rowcount = 1
+
+    def get_connection(self):
+        self.checkouts += 1
+        conn = FakeConnection(self)
+        self.connections.append(conn)
+        return conn
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    fake = FakePool()
+    monkeypatch.setattr(database, "get_pool", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.invalidate()
+    yield
+    cache.invalidate()
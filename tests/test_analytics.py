@@ -0,0 +1,62 @@
+import math
+import statistics
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import analytics, database
+from benchmarks.standin import StandinPool
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    pool = StandinPool().seed(characters=300, classes=4)
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    analytics.summaries.clear()
+    return pool
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def joined(pool, class_id=None):
+    rows = pool._keepalive.execute(
+        "SELECT c.class_id, s.strength, s.faith FROM characters c JOIN stats s ON c.stat_id = s.id"
+    ).fetchall()
+    return [row for row in rows if class_id is None or row[0] == class_id]
+
+
+def test_summary_matches_a_full_scan(standin, client):
+    data = client.get("/api/stats/summary?class_id=2&bucket=25").get_json()
+    rows = joined(standin, class_id=2)
+    strength = sorted(row[1] for row in rows)
+    summary = data["stats"]["strength"]
+    assert data["count"] == len(rows)
+    assert (summary["min"], summary["max"]) == (strength[0], strength[-1])
+    assert summary["mean"] == round(statistics.fmean(strength), 2)
+    assert summary["stddev"] == round(statistics.pstdev(strength), 2)
+    assert summary["percentiles"]["p50"] == strength[math.ceil(len(strength) / 2) - 1]
+    assert sum(bucket["count"] for bucket in summary["histogram"]) == len(rows)
+    assert all(bucket["to"] - bucket["from"] == 24 for bucket in summary["histogram"])
+    assert client.get("/api/stats/summary?bucket=0").status_code == 400
+
+
+def test_by_class_and_versioned_reuse(standin, client):
+    first = client.get("/api/stats/by-class?format=json").get_json()["classes"]
+    faith = [row[2] for row in joined(standin, class_id=first[0]["class_id"])]
+    assert first[0]["characters"] == len(faith) and first[0]["faith"]["avg"] == round(statistics.fmean(faith), 2)
+    checkouts = standin.checkouts
+    assert client.get("/api/stats/by-class").get_json()["classes"] == first
+    assert analytics.summaries.stats()["hits"] == 1 and standin.checkouts == checkouts + 1
+    client.post("/api/characters", json={"name": "Solaire", "stat_id": 1, "class_id": first[0]["class_id"], "weapon_id": 1})
+    again = client.get("/api/stats/by-class").get_json()["classes"]
+    assert again[0]["characters"] == first[0]["characters"] + 1
+    xml = client.get("/api/stats/summary?format=xml&q=Hero%200000001")
+    assert xml.status_code == 200 and b"<count>1</count>" in xml.data
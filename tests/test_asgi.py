@@ -0,0 +1,198 @@
+import asyncio
+import gzip
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import async_database, database, response_cache
+from app.asgi import create_asgi_app
+
+
+class FakeAsyncCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.rows = []
+
+    async def execute(self, sql, params=()):
+        self.pool.executed.append((sql, params))
+        if sql.startswith("SELECT name, version"):
+            self.rows = [{"name": name, "version": 0, "updated_at": datetime(2024, 1, 1)} for name in params]
+        else:
+            self.rows = list(self.pool.rows)
+
+    async def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    async def fetchmany(self, size=1):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    async def close(self):
+        pass
+
+
+class FakeAsyncConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def cursor(self, dictionary=True):
+        return FakeAsyncCursor(self.pool)
+
+    async def close(self):
+        self.pool.in_use -= 1
+
+
+class FakeAsyncPool:
+    def __init__(self):
+        self.rows = []
+        self.executed = []
+        self.in_use = 0
+
+    async def get_connection(self):
+        self.in_use += 1
+        return FakeAsyncConnection(self)
+
+
+@pytest.fixture
+def async_pool(monkeypatch):
+    fake = FakeAsyncPool()
+
+    async def get_pool():
+        return fake
+
+    monkeypatch.setattr(async_database, "get_pool", get_pool)
+    monkeypatch.setattr(async_database, "slots", asyncio.Semaphore(5))
+    return fake
+
+
+def call(app, method, path, headers=None, body=b""):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers.items() if isinstance(headers, dict) else headers or [])],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.fixture
+def asgi_app():
+    return create_asgi_app()
+
+
+def login(app):
+    status, _, body = call(app, "POST", "/api/login", {"Content-Type": "application/json"}, b'{"username": "admin", "password": "password"}')
+    assert status == 200
+    return {"Authorization": f"Bearer {json.loads(body)['access_token']}"}
+
+
+def test_async_list_and_conditional_get(asgi_app, async_pool):
+    async_pool.rows = [{"id": 1, "name": "Knight", "description": "Heavy"}]
+    headers = login(asgi_app)
+    status, response_headers, body = call(asgi_app, "GET", "/api/classes?limit=10", headers)
+    assert status == 200
+    assert json.loads(body) == {"classes": [{"id": 1, "name": "Knight", "description": "Heavy"}], "next_cursor": None}
+    status, _, body = call(asgi_app, "GET", "/api/classes?limit=10", {**headers, "If-None-Match": response_headers["etag"]})
+    assert status == 304 and body == b""
+    assert async_pool.in_use == 0
+
+
+def test_async_routes_keep_auth_formats_and_head(asgi_app, async_pool):
+    status, _, body = call(asgi_app, "GET", "/api/characters/1")
+    assert status == 401 and json.loads(body) == {"msg": "Missing Authorization Header"}
+    headers = login(asgi_app)
+    async_pool.rows = [{"id": 1, "name": "Artorias", "stat_id": 1, "class_id": 1, "weapon_id": 1}]
+    status, response_headers, body = call(asgi_app, "GET", "/api/characters/1?format=xml", headers)
+    assert status == 200 and response_headers["content-type"] == "application/xml"
+    assert body == b"<response><id>1</id><name>Artorias</name><stat_id>1</stat_id><class_id>1</class_id><weapon_id>1</weapon_id></response>"
+    status, _, body = call(asgi_app, "GET", "/api/characters?search=bogus", headers)
+    assert status == 400
+    status, _, body = call(asgi_app, "HEAD", "/api/characters/1", headers)
+    assert status == 200 and body == b""
+
+
+def test_async_stream_is_compressed_and_releases_connection(asgi_app, async_pool):
+    async_pool.rows = [{"id": i, "name": f"Class {i}", "description": ""} for i in range(1, 6)]
+    headers = login(asgi_app)
+    status, response_headers, body = call(asgi_app, "GET", "/api/classes?format=ndjson", {**headers, "Accept-Encoding": "gzip"})
+    assert status == 200 and response_headers["content-encoding"] == "gzip"
+    assert [json.loads(line)["id"] for line in gzip.decompress(body).splitlines()] == [1, 2, 3, 4, 5]
+    async_pool.rows = []
+    assert call(asgi_app, "GET", "/api/classes?stream=1&format=xml", headers)[2] == b"<response><classes /></response>"
+    assert async_pool.in_use == 0
+
+
+def test_async_multi_get(asgi_app, async_pool):
+    async_pool.rows = [{"id": 1, "name": "Sword", "type": "Melee", "description": ""}, {"id": 2, "name": "Staff", "type": "Magic", "description": ""}]
+    headers = login(asgi_app)
+    status, _, body = call(asgi_app, "GET", "/api/weapons?ids=2,5,1", headers)
+    data = json.loads(body)
+    assert status == 200 and [item["id"] for item in data["weapons"]] == [2, 1] and data["missing"] == [5]
+    assert "IN (%s, %s, %s)" in async_pool.executed[-1][0]
+
+
+def test_async_pool_exhaustion_returns_503(asgi_app, async_pool, monkeypatch):
+    headers = login(asgi_app)
+    monkeypatch.setattr(async_database, "slots", asyncio.Semaphore(0))
+    monkeypatch.setattr(async_database.Config, "MYSQL_POOL_TIMEOUT", 0.01)
+    status, response_headers, body = call(asgi_app, "GET", "/api/classes/1", headers)
+    assert status == 503 and response_headers["retry-after"] == "1"
+    assert json.loads(body) == {"message": "Database busy, retry shortly"}
+
+
+def test_async_reads_use_replicas_unless_pinned(asgi_app, async_pool, monkeypatch):
+    replica = FakeAsyncPool()
+    replica.rows = [{"id": 1, "name": "Knight", "description": "Heavy"}]
+    monkeypatch.setattr(async_database.Config, "MYSQL_REPLICA_HOSTS", "replica:3306")
+    monkeypatch.setattr(async_database, "replicas", [(replica, asyncio.Semaphore(5))])
+    headers = login(asgi_app)
+    assert call(asgi_app, "GET", "/api/classes/1", headers)[0] == 200
+    assert replica.executed and not async_pool.executed
+    pinned = {**headers, "Cookie": f"{database.PIN_COOKIE}={time.time() + 60:.3f}"}
+    async_pool.rows = replica.rows
+    assert call(asgi_app, "GET", "/api/classes/2", pinned)[0] == 200
+    assert async_pool.executed and replica.in_use == async_pool.in_use == 0
+
+
+def test_async_pin_survives_split_cookie_headers(asgi_app, async_pool, monkeypatch):
+    replica = FakeAsyncPool()
+    async_pool.rows = [{"id": 1, "name": "Knight", "description": "Heavy"}]
+    monkeypatch.setattr(async_database.Config, "MYSQL_REPLICA_HOSTS", "replica:3306")
+    monkeypatch.setattr(async_database, "replicas", [(replica, asyncio.Semaphore(5))])
+    headers = [*login(asgi_app).items(), ("Cookie", "theme=dark"), ("Cookie", f"{database.PIN_COOKIE}={time.time() + 60:.3f}")]
+    assert call(asgi_app, "GET", "/api/classes/1", headers)[0] == 200
+    assert async_pool.executed and not replica.executed
+
+
+def test_async_shared_response_cache_runs_off_the_loop(asgi_app, async_pool, monkeypatch, tmp_path):
+    store = response_cache.SharedStore(str(tmp_path / "responses.sqlite3"), 1 << 20)
+    monkeypatch.setattr(response_cache.Config, "RESPONSE_CACHE", "shared")
+    monkeypatch.setattr(response_cache, "store", store)
+    threads = []
+    original = asyncio.to_thread
+    monkeypatch.setattr(asyncio, "to_thread", lambda func, *args: threads.append(func.__name__) or original(func, *args))
+    async_pool.rows = [{"id": 1, "name": "Knight", "description": "Heavy"}]
+    headers = login(asgi_app)
+    first = call(asgi_app, "GET", "/api/classes/1", headers)
+    executed = len(async_pool.executed)
+    assert call(asgi_app, "GET", "/api/classes/1", headers)[2] == first[2]
+    assert len(async_pool.executed) == executed and store.stats()["entries"] == 1
+    assert threads == ["lookup", "remember", "lookup"]
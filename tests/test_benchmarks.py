@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import database
+from app.utils import encode_xml
+from benchmarks import run as bench
+from benchmarks.standin import StandinPool
+
+
+def test_benchmark_runner_produces_report():
+    report = bench.run(characters=50, iterations=2, sizes=[10])
+    assert database.pool is None
+    assert set(report) == {"meta", "routes", "queries", "serialization", "memory"}
+    assert report["memory"]["list_characters(limit=1000) compact"]["peak_kb"] > 0
+    assert report["routes"]["GET /api/characters/1"]["n"] == 2
+    assert {"p50_ms", "p90_ms", "p99_ms", "ops_per_s"} <= set(report["queries"]["list_characters(limit=100)"])
+    assert report["serialization"]["format_response xml 10 rows"]["bytes"] > 0
+    assert "p50" in bench.compare(report, report)
+
+
+def test_xml_encoder_matches_elementtree():
+    payloads = [
+        {"characters": [{"id": 1, "name": "A & <B> \"c\" 'd'", "stat_id": None, "stats": {"id": 2, "strength": 5}}]},
+        {"items": [], "empty": {}, "text": "", "flag": True, "ratio": 1.5, "nested": [[1, 2], "x", None, {}]},
+        [{"id": 1, "name": "\u00e9l\u00e8ve \U0001f5e1"}, 3],
+        {"data": "plain"},
+    ]
+    for payload in payloads:
+        assert encode_xml("response", payload) == bench.etree_xml(payload)
+
+
+def test_streamed_xml_route_matches_elementtree(app, monkeypatch):
+    pool = StandinPool().seed(characters=1)
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/api/classes", json={"name": "x<y", "description": ""}, headers=headers).status_code == 201
+    rows = client.get("/api/classes?stream=1", headers=headers).get_json()["classes"]
+    assert client.get("/api/classes?stream=1&format=xml", headers=headers).data == bench.etree_xml({"classes": rows})
+    empty = client.get(f"/api/classes?stream=1&format=xml&after_id={rows[-1]['id']}", headers=headers).data
+    assert empty == encode_xml("response", {"classes": []}) == bench.etree_xml({"classes": []})
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import query
+
+
+def reference_responder(existing):
+    def respond(sql, params):
+        if sql.startswith("SELECT EXISTS"):
+            return [{"in_use": int(params[0] in existing["in_use"])}] if params[0] in existing["classes"] else []
+        if "UNION ALL" in sql:
+            rows = []
+            for table in ("stats", "classes", "weapons"):
+                rows.extend({"tbl": table, "id": value} for value in params if value in existing[table])
+            return rows
+        if sql.startswith("SELECT DISTINCT"):
+            return [{"id": value} for value in params if value in existing["in_use"]]
+        if sql.startswith("SELECT id FROM"):
+            table = sql.split()[3]
+            return [{"id": value} for value in params if value in existing[table]]
+        return []
+    return respond
+
+
+def test_bulk_create_characters_checks_references_once(app, fake_pool):
+    fake_pool.responder = reference_responder({"stats": {1}, "classes": {1}, "weapons": {1}})
+    items = [
+        {"name": "A", "stat_id": 1, "class_id": 1, "weapon_id": 1},
+        {"name": "B", "stat_id": 9, "class_id": 1, "weapon_id": 1},
+        {"name": "C", "stat_id": 1, "class_id": 1, "weapon_id": 1},
+    ]
+    with app.app_context():
+        results = query.bulk_create("characters", items)
+    conn = fake_pool.connections[0]
+    assert fake_pool.checkouts == 1
+    assert conn.commits == 1
+    assert sum("UNION ALL" in sql for sql, _ in conn.executed) == 1
+    insert_sql, rows = conn.executed[-2]
+    assert conn.executed[-1] == (query.BUMP_VERSION, ("characters",))
+    assert insert_sql.startswith("INSERT INTO characters")
+    assert rows == [("A", 1, 1, 1), ("C", 1, 1, 1)]
+    assert results[0] == ({"id": 100, "name": "A", "stat_id": 1, "class_id": 1, "weapon_id": 1}, None)
+    assert results[1] == (None, "invalid_foreign")
+    assert results[2][0]["id"] == 101
+
+
+def test_bulk_update_and_delete_report_per_item(app, fake_pool):
+    fake_pool.responder = reference_responder({"classes": {1, 2}, "in_use": {1}})
+    with app.app_context():
+        updated = query.bulk_update("classes", [{"id": 2, "name": "Mage", "description": ""}, {"id": 5, "name": "X", "description": ""}])
+        deleted = query.bulk_delete("classes", [1, 2, 3])
+    assert updated[0][1] is None and updated[1] == (None, "not_found")
+    assert deleted == [(1, "in_use"), (2, ""), (3, "not_found")]
+    executed = [sql for sql, _ in fake_pool.connections[0].executed]
+    assert executed[-4].startswith("SELECT id FROM classes") and executed[-4].endswith(" FOR UPDATE")
+    assert executed[-3].startswith("SELECT DISTINCT class_id") and executed[-3].endswith(" LOCK IN SHARE MODE")
+    delete_sql, params = fake_pool.connections[0].executed[-2]
+    assert delete_sql == "DELETE FROM classes WHERE id IN (%s)" and params == (2,)
+
+
+def test_single_writes_validate_in_one_query(app, fake_pool):
+    fake_pool.responder = reference_responder({"stats": {1}, "classes": {1, 2}, "weapons": {1}, "in_use": {1}})
+    with app.app_context():
+        assert query.create_character("A", 1, 1, 9) == (None, "invalid_foreign")
+        assert query.delete_class(1) == (False, "in_use")
+        assert query.delete_class(3) == (False, "not_found")
+        assert query.delete_class(2) == (True, "")
+    executed = [sql for sql, _ in fake_pool.connections[0].executed]
+    assert fake_pool.checkouts == 1
+    assert executed[0].count("LOCK IN SHARE MODE") == 3
+    assert len(executed) == 6
+    assert executed[-2:] == ["DELETE FROM classes WHERE id = %s", query.BUMP_VERSION]
@@ -0,0 +1,79 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import cache, database, query
+from app.cache import TTLCache
+
+
+def test_ttl_cache_lru_eviction_and_expiry():
+    lru = TTLCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == (True, 1)
+    lru.set("c", 3)
+    assert lru.get("b") == (False, None)
+    assert lru.stats() == {"size": 2, "hits": 1, "misses": 1, "evictions": 1}
+    short = TTLCache(maxsize=2, ttl=0.01)
+    short.set("a", 1)
+    time.sleep(0.02)
+    assert short.get("a") == (False, None)
+
+
+def test_reference_reads_are_cached_and_invalidated_by_writes(app, fake_pool):
+    with app.app_context():
+        assert query.get_class(1)["name"] == "Knight"
+        assert query.get_class(1)["name"] == "Knight"
+        conn = fake_pool.connections[0]
+        assert len(conn.executed) == 1
+        query.update_class(1, "Knight", "Heavier")
+        executed = len(conn.executed)
+        query.get_class(1)
+        assert len(conn.executed) == executed + 1
+        # The delete guard reads the writer connection, not the cached row, and its commit clears the cache.
+        assert query.delete_class(1) == (True, "")
+        assert conn.executed[executed + 1][0].startswith("SELECT EXISTS")
+        executed = len(conn.executed)
+        query.get_class(1)
+        assert len(conn.executed) == executed + 1
+    stats = cache.cache_stats()["classes"]
+    assert stats["hits"] >= 2
+    assert stats["misses"] >= 2
+
+
+def test_conditional_get_and_cross_worker_invalidation(app, fake_pool):
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    first = client.get("/api/classes/1", headers=headers)
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"') and first.headers["Last-Modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    resp = client.get("/api/classes/1", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 304 and resp.data == b""
+    resp = client.get("/api/classes/1", headers={**headers, "If-Modified-Since": first.headers["Last-Modified"]})
+    assert resp.status_code == 304
+    assert client.get("/api/classes/2", headers={**headers, "If-None-Match": etag}).status_code == 200
+    executed = len(fake_pool.connections)
+    fake_pool.versions["classes"] = 1
+    resp = client.get("/api/classes/1", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+    assert sum("FROM classes" in sql for conn in fake_pool.connections[executed:] for sql, _ in conn.executed) == 1
+
+
+def test_commit_clears_rows_cached_while_the_write_was_open(app, monkeypatch):
+    from benchmarks.standin import StandinPool
+
+    pool = StandinPool().seed(characters=1)
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    with app.app_context():
+        with database.transaction():
+            query.update_class(1, "Renamed", "")
+            # A concurrent reader caching the pre-commit row must not outlive the commit.
+            cache.caches["classes"].set(("get_class", (1,), ()), {"id": 1, "name": "Class 0", "description": ""})
+        assert query.get_class(1)["name"] == "Renamed"
+        versions = query.table_versions(("classes", "characters"))
+        assert query.update_class(999, "Missing", "") is None
+        assert query.delete_character(999) is False
+        assert query.table_versions(("classes", "characters")) == versions
@@ -0,0 +1,48 @@
+import gzip
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.compression import negotiate, precompressed_cache
+from werkzeug.datastructures import Accept
+
+
+def login(client):
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_negotiate_respects_quality_and_availability():
+    assert negotiate(Accept([("gzip", 1)])).name == "gzip"
+    assert negotiate(Accept([("gzip", 0)])) is None
+    assert negotiate(Accept([("deflate", 1)])) is None
+    assert negotiate(Accept([("*", 1)])) is not None
+
+
+def test_large_responses_are_compressed_and_cached(app, fake_pool):
+    precompressed_cache.clear()
+    hits = precompressed_cache.stats()["hits"]
+    fake_pool.rows = [{"id": i, "name": f"Class {i}", "description": "x" * 40} for i in range(1, 101)]
+    client = app.test_client()
+    headers = {**login(client), "Accept-Encoding": "gzip"}
+    plain = client.get("/api/classes", headers=login(client))
+    assert "Content-Encoding" not in plain.headers and plain.headers["Vary"] == "Accept-Encoding"
+    first = client.get("/api/classes", headers=headers)
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(first.data) == plain.data
+    assert len(first.data) < len(plain.data)
+    second = client.get("/api/classes", headers=headers)
+    assert second.data == first.data
+    assert precompressed_cache.stats()["hits"] == hits + 1
+    fake_pool.rows = [{"id": 1, "name": "Knight", "description": ""}]
+    small = client.get("/api/classes/1", headers=headers)
+    assert "Content-Encoding" not in small.headers
+
+
+def test_streamed_responses_are_compressed_incrementally(app, fake_pool):
+    fake_pool.rows = [{"id": i, "name": f"Class {i}", "description": ""} for i in range(1, 6)]
+    client = app.test_client()
+    resp = client.get("/api/classes?format=ndjson", headers={**login(client), "Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(resp.data).decode().count("\n") == 5
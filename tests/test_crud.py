@@ -1,4 +1,5 @@
 import sys
+from datetime import datetime
 from pathlib import Path
 import pytest
 
@@ -24,8 +25,16 @@ def mock_queries(monkeypatch):
     def next_id(items):
         return max((item["id"] for item in items), default=0) + 1
 
-    def list_classes():
-        return list(classes)
+    def page(items, limit, after_id):
+        rows = [item for item in items if after_id is None or item["id"] > after_id]
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return list(rows[:limit]), next_cursor
+
+    def list_classes(limit, after_id=None):
+        return page(classes, limit, after_id)
+
+    def iter_classes(after_id=None):
+        return iter(page(classes, len(classes), after_id)[0])
 
     def get_class(class_id):
         return next((c for c in classes if c["id"] == class_id), None)
@@ -50,8 +59,11 @@ def mock_queries(monkeypatch):
         classes[:] = [c for c in classes if c["id"] != class_id]
         return True, ""
 
-    def list_weapons():
-        return list(weapons)
+    def list_weapons(limit, after_id=None):
+        return page(weapons, limit, after_id)
+
+    def iter_weapons(after_id=None):
+        return iter(page(weapons, len(weapons), after_id)[0])
 
     def get_weapon(weapon_id):
         return next((w for w in weapons if w["id"] == weapon_id), None)
@@ -76,8 +88,11 @@ def mock_queries(monkeypatch):
         weapons[:] = [w for w in weapons if w["id"] != weapon_id]
         return True, ""
 
-    def list_stats():
-        return list(stats)
+    def list_stats(limit, after_id=None):
+        return page(stats, limit, after_id)
+
+    def iter_stats(after_id=None):
+        return iter(page(stats, len(stats), after_id)[0])
 
     def get_stat(stat_id):
         return next((s for s in stats if s["id"] == stat_id), None)
@@ -102,7 +117,19 @@ def mock_queries(monkeypatch):
         stats[:] = [s for s in stats if s["id"] != stat_id]
         return True, ""
 
-    def list_characters(filters=None):
+    def expand_character(item, expand):
+        if not expand:
+            return item
+        item = dict(item)
+        if "stats" in expand:
+            item["stats"] = get_stat(item["stat_id"])
+        if "class" in expand:
+            item["class"] = get_class(item["class_id"])
+        if "weapon" in expand:
+            item["weapon"] = get_weapon(item["weapon_id"])
+        return item
+
+    def list_characters(filters, limit, after_id=None, expand=()):
         filters = filters or {}
         result = list(characters)
         if filters.get("name"):
@@ -116,10 +143,15 @@ def mock_queries(monkeypatch):
             key = f"{stat_field}_min"
             if filters.get(key) is not None:
                 result = [c for c in result if next(s for s in stats if s["id"] == c["stat_id"])[stat_field] >= filters[key]]
-        return list(result)
+        items, next_cursor = page(result, limit, after_id)
+        return [expand_character(c, expand) for c in items], next_cursor
+
+    def iter_characters(filters, after_id=None, expand=()):
+        return iter(list_characters(filters, len(characters), after_id, expand)[0])
 
-    def get_character(character_id):
-        return next((c for c in characters if c["id"] == character_id), None)
+    def get_character(character_id, expand=()):
+        item = next((c for c in characters if c["id"] == character_id), None)
+        return expand_character(item, expand) if item else None
 
     def create_character(name, stat_id, class_id, weapon_id):
         if not get_stat(stat_id) or not get_class(class_id) or not get_weapon(weapon_id):
@@ -144,22 +176,67 @@ def mock_queries(monkeypatch):
         characters[:] = [c for c in characters if c["id"] != character_id]
         return True
 
+    tables = {"classes": classes, "weapons": weapons, "stats": stats, "characters": characters}
+
+    def bulk_create(table, items):
+        results = []
+        for item in items:
+            if table == "characters" and (not get_stat(item["stat_id"]) or not get_class(item["class_id"]) or not get_weapon(item["weapon_id"])):
+                results.append((None, "invalid_foreign"))
+                continue
+            created = {"id": next_id(tables[table]), **item}
+            tables[table].append(created)
+            results.append((created, None))
+        return results
+
+    def bulk_update(table, items):
+        results = []
+        for item in items:
+            existing = next((row for row in tables[table] if row["id"] == item["id"]), None)
+            if existing:
+                existing.update(item)
+            results.append((existing, None if existing else "not_found"))
+        return results
+
+    def bulk_delete(table, ids):
+        results = []
+        for record_id in ids:
+            if table == "classes" and any(ch["class_id"] == record_id for ch in characters):
+                results.append((record_id, "in_use"))
+            elif any(row["id"] == record_id for row in tables[table]):
+                tables[table][:] = [row for row in tables[table] if row["id"] != record_id]
+                results.append((record_id, ""))
+            else:
+                results.append((record_id, "not_found"))
+        return results
+
+    def table_versions(names):
+        return {name: (0, datetime(2024, 1, 1)) for name in names}
+
+    monkeypatch.setattr(routes_module, "table_versions", table_versions)
+    monkeypatch.setattr(routes_module, "bulk_create", bulk_create)
+    monkeypatch.setattr(routes_module, "bulk_update", bulk_update)
+    monkeypatch.setattr(routes_module, "bulk_delete", bulk_delete)
     monkeypatch.setattr(routes_module, "list_classes", list_classes)
+    monkeypatch.setattr(routes_module, "iter_classes", iter_classes)
     monkeypatch.setattr(routes_module, "get_class", get_class)
     monkeypatch.setattr(routes_module, "create_class", create_class)
     monkeypatch.setattr(routes_module, "update_class", update_class)
     monkeypatch.setattr(routes_module, "delete_class", delete_class)
     monkeypatch.setattr(routes_module, "list_weapons", list_weapons)
+    monkeypatch.setattr(routes_module, "iter_weapons", iter_weapons)
     monkeypatch.setattr(routes_module, "get_weapon", get_weapon)
     monkeypatch.setattr(routes_module, "create_weapon", create_weapon)
     monkeypatch.setattr(routes_module, "update_weapon", update_weapon)
     monkeypatch.setattr(routes_module, "delete_weapon", delete_weapon)
     monkeypatch.setattr(routes_module, "list_stats", list_stats)
+    monkeypatch.setattr(routes_module, "iter_stats", iter_stats)
     monkeypatch.setattr(routes_module, "get_stat", get_stat)
     monkeypatch.setattr(routes_module, "create_stat", create_stat)
     monkeypatch.setattr(routes_module, "update_stat", update_stat)
     monkeypatch.setattr(routes_module, "delete_stat", delete_stat)
     monkeypatch.setattr(routes_module, "list_characters", list_characters)
+    monkeypatch.setattr(routes_module, "iter_characters", iter_characters)
     monkeypatch.setattr(routes_module, "get_character", get_character)
     monkeypatch.setattr(routes_module, "create_character", create_character)
     monkeypatch.setattr(routes_module, "update_character", update_character)
@@ -197,6 +274,48 @@ def test_list_classes_json(client):
     assert "classes" in resp.get_json()
 
 
+def test_list_pagination_cursor(client):
+    token = auth_token(client)
+    first = client.get("/api/weapons?limit=1", headers={"Authorization": f"Bearer {token}"}).get_json()
+    assert [w["id"] for w in first["weapons"]] == [1]
+    assert first["next_cursor"] == 1
+    second = client.get(f"/api/weapons?limit=1&after_id={first['next_cursor']}", headers={"Authorization": f"Bearer {token}"}).get_json()
+    assert [w["id"] for w in second["weapons"]] == [2]
+    assert second["next_cursor"] is None
+
+
+def test_character_search_pagination(client):
+    token = auth_token(client)
+    resp = client.get("/api/characters?limit=1&after_id=1", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [c["name"] for c in data["characters"]] == ["Lucatiel"]
+    assert data["next_cursor"] is None
+
+
+def test_stream_json_ndjson_and_xml(client):
+    token = auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    resp = client.get("/api/classes?stream=1", headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json() == {"classes": [{"id": 1, "name": "Knight", "description": "Heavy"}, {"id": 2, "name": "Mage", "description": "Magic"}]}
+    resp = client.get("/api/characters?format=ndjson&class_id=2", headers=headers)
+    assert resp.mimetype == "application/x-ndjson"
+    assert resp.data.decode().splitlines() == ['{"id":2,"name":"Lucatiel","stat_id":2,"class_id":2,"weapon_id":2}']
+    resp = client.get("/api/weapons?stream=1&format=xml&after_id=1", headers=headers)
+    assert resp.data == b"<response><weapons><item><id>2</id><name>Staff</name><type>Magic</type><description>Wood</description></item></weapons></response>"
+    resp = client.get("/api/weapons?stream=1&format=xml&after_id=2", headers=headers)
+    assert resp.data == b"<response><weapons /></response>"
+    assert client.get("/api/weapons?stream=1&after_id=2", headers=headers).get_json() == {"weapons": []}
+
+
+def test_cache_stats(client):
+    token = auth_token(client)
+    resp = client.get("/api/cache/stats", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    assert set(resp.get_json()["caches"]) == {"classes", "weapons", "stats"}
+
+
 def test_create_update_delete_class(client):
     token = auth_token(client)
     create_resp = client.post("/api/classes", json={"name": "Rogue", "description": "Fast"}, headers={"Authorization": f"Bearer {token}"})
@@ -262,11 +381,39 @@ def test_character_search_and_xml(client):
     resp_json = client.get("/api/characters?q=Arto", headers={"Authorization": f"Bearer {token}"})
     assert resp_json.status_code == 200
     assert len(resp_json.get_json()["characters"]) == 1
+    resp_bad_mode = client.get("/api/characters?q=Arto&search=regex", headers={"Authorization": f"Bearer {token}"})
+    assert resp_bad_mode.status_code == 400
     resp_xml = client.get("/api/characters?format=xml&strength_min=10", headers={"Authorization": f"Bearer {token}"})
     assert resp_xml.status_code == 200
     assert b"<characters>" in resp_xml.data or b"<item>" in resp_xml.data
 
 
+def test_character_expand_json_and_xml(client):
+    token = auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    item = client.get("/api/characters/1?expand=class,weapon", headers=headers).get_json()
+    assert item["class"]["name"] == "Knight"
+    assert item["weapon"]["name"] == "Sword"
+    assert "stats" not in item
+    resp = client.get("/api/characters?expand=stats&format=xml&class_id=2", headers=headers)
+    assert b"<stats><id>2</id><strength>6</strength>" in resp.data
+
+
+def test_bulk_create_update_delete(client):
+    token = auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    payload = {"items": [{"name": "A", "stat_id": 1, "class_id": 1, "weapon_id": 1}, {"name": "B"}, {"name": "C", "stat_id": 1, "class_id": 99, "weapon_id": 1}]}
+    data = client.post("/api/characters/bulk", json=payload, headers=headers).get_json()
+    assert [r["status"] for r in data["results"]] == [201, 400, 400]
+    assert data["succeeded"] == 1 and data["failed"] == 2
+    new_id = data["results"][0]["item"]["id"]
+    data = client.put("/api/classes/bulk", json=[{"id": 2, "name": "Sorcerer"}, {"name": "NoId"}, {"id": 42, "name": "Ghost"}], headers=headers).get_json()
+    assert [r["status"] for r in data["results"]] == [200, 400, 404]
+    data = client.delete("/api/characters/bulk", json={"ids": [new_id, 999]}, headers=headers).get_json()
+    assert data["results"] == [{"id": new_id, "status": 200, "deleted": True}, {"id": 999, "status": 404, "message": "Not found"}]
+    assert client.post("/api/weapons/bulk", json={"items": []}, headers=headers).status_code == 400
+
+
 def test_character_full_crud(client):
     token = auth_token(client)
     create_resp = client.post("/api/characters", json={"name": "NewChar", "stat_id": 1, "class_id": 1, "weapon_id": 1}, headers={"Authorization": f"Bearer {token}"})
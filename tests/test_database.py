@@ -0,0 +1,212 @@
+import json
+import os
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import cache, database, query
+
+
+def test_request_reuses_single_connection(app, fake_pool):
+    with app.app_context():
+        query.create_class("Knight", "Heavy")
+        query.delete_class(7)
+        assert fake_pool.checkouts == 1
+        assert fake_pool.released == 0
+    assert fake_pool.released == 1
+
+
+def test_transaction_defers_commit_and_rolls_back(app, fake_pool):
+    with app.app_context():
+        with database.transaction():
+            query.create_class("Knight", "Heavy")
+            query.create_class("Mage", "Magic")
+        conn = fake_pool.connections[0]
+        assert conn.commits == 1
+        with pytest.raises(ValueError):
+            with database.transaction():
+                query.create_class("Rogue", "Fast")
+                raise ValueError("boom")
+        assert conn.commits == 1
+        assert conn.rollbacks == 1
+
+
+def test_cursor_outside_app_context_releases_connection(fake_pool):
+    assert query.get_class(1)["name"] == "Knight"
+    assert fake_pool.checkouts == 1
+    assert fake_pool.released == 1
+
+
+def test_list_uses_keyset_predicate(app, fake_pool):
+    fake_pool.rows = []
+    with app.app_context():
+        items, next_cursor = query.list_characters({"class_id": 2}, 50, after_id=10)
+        sql, params = fake_pool.connections[0].executed[-1]
+    assert "c.id > %s" in sql and sql.endswith("ORDER BY c.id LIMIT %s")
+    assert params == (2, 10, 51)
+    assert next_cursor is None
+
+
+def test_stream_releases_connection_when_abandoned(app, fake_pool):
+    fake_pool.rows = [{"id": i, "name": f"c{i}", "description": ""} for i in range(1, 6)]
+    rows = query.iter_classes()
+    assert fake_pool.checkouts == 0
+    assert next(rows)["id"] == 1
+    rows.close()
+    assert fake_pool.checkouts == 1
+    assert fake_pool.released == 1
+
+
+def test_character_expand_uses_single_join(app, fake_pool):
+    fake_pool.rows = [{
+        "id": 1, "name": "Artorias", "stat_id": 3, "class_id": 4, "weapon_id": 5,
+        "class__id": 4, "class__name": "Knight", "class__description": "Heavy",
+        "weapon__id": 5, "weapon__name": "Sword", "weapon__type": "Melee", "weapon__description": "Sharp",
+    }]
+    with app.app_context():
+        item = query.get_character(1, ("class", "weapon"))
+        sql, params = fake_pool.connections[0].executed[-1]
+    assert len(fake_pool.connections[0].executed) == 1
+    assert "cl.id AS class__id" in sql
+    assert "JOIN classes cl ON c.class_id = cl.id JOIN weapons w ON c.weapon_id = w.id" in sql
+    assert sql.endswith("WHERE c.id = %s") and params == (1,)
+    assert item["class_id"] == 4
+    assert item["weapon"] == {"id": 5, "name": "Sword", "type": "Melee", "description": "Sharp"}
+
+
+def test_writes_echo_payload_without_reread(app, fake_pool, monkeypatch):
+    with app.app_context():
+        item = query.create_class("Rogue", "Fast")
+        assert item == {"id": 7, "name": "Rogue", "description": "Fast"}
+        assert [sql.split()[0] for sql, _ in fake_pool.connections[0].executed] == ["INSERT", "UPDATE"]
+        monkeypatch.setattr(database.Config, "WRITE_READBACK", True)
+        query.update_class(7, "Rogue", "Faster")
+        assert [sql.split()[0] for sql, _ in fake_pool.connections[0].executed] == ["INSERT", "UPDATE", "UPDATE", "UPDATE", "SELECT"]
+
+
+def test_unchanged_update_keeps_the_version_and_missing_row_is_none(app, fake_pool):
+    fake_pool.rowcount = 0
+    with app.app_context():
+        assert query.update_class(1, "Knight", "Heavy") == {"id": 1, "name": "Knight", "description": "Heavy"}
+        fake_pool.rows = []
+        assert query.update_class(2, "Knight", "Heavy") is None
+    statements = [sql for sql, _ in fake_pool.connections[0].executed]
+    assert not any("table_versions" in sql for sql in statements)
+    assert statements.count("SELECT id FROM classes WHERE id = %s") == 2
+
+
+def test_readback_returns_the_written_values(app, monkeypatch):
+    from benchmarks.standin import StandinPool
+
+    pool = StandinPool().seed(characters=1)
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    monkeypatch.setattr(database.Config, "WRITE_READBACK", True)
+    with app.app_context():
+        assert query.get_class(1)["name"] == "Class 0"
+        assert query.update_class(1, "Renamed", "Heavy") == {"id": 1, "name": "Renamed", "description": "Heavy"}
+        with database.transaction():
+            assert query.update_class(1, "Again", "")["name"] == "Again"
+            item, _ = query.update_character(1, "Solaire", 1, 1, 1)
+            assert item["name"] == "Solaire" and item["class_id"] == 1
+
+
+def test_compact_rows_serialize_like_dicts(app, monkeypatch):
+    from benchmarks.standin import StandinPool
+    from app.utils import encode_xml
+
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    pool = StandinPool().seed(characters=20)
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    outputs = {}
+    for compact in (False, True):
+        monkeypatch.setattr(database.Config, "COMPACT_ROWS", compact)
+        cache.invalidate()
+        with app.app_context():
+            characters, next_cursor = query.list_characters({}, 5, after_id=3)
+            stats, _ = query.list_stats(5)
+            streamed = client.get("/api/stats?format=ndjson&after_id=15", headers={"Authorization": f"Bearer {token}"}).get_data(as_text=True)
+            data = {"characters": characters, "stats": stats, "next_cursor": next_cursor}
+            outputs[compact] = (app.json.response(data).get_data(), encode_xml("response", data), streamed)
+        assert next_cursor == 8 and len(streamed.splitlines()) == 5
+        assert isinstance(stats[0], dict) != compact
+    assert outputs[True][:2] == outputs[False][:2]
+    assert [json.loads(line) for line in outputs[True][2].splitlines()] == [json.loads(line) for line in outputs[False][2].splitlines()]
+
+
+def test_forked_worker_builds_its_own_pool(monkeypatch):
+    parent_pool = object()
+    monkeypatch.setattr(database, "pool", parent_pool)
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if database.pool is None and database._inherited[-1] is parent_pool else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert database.pool is parent_pool
+
+
+def test_reads_go_to_replica_until_client_writes(app, monkeypatch):
+    from benchmarks.standin import StandinPool
+
+    primary, replica = StandinPool().seed(characters=5), StandinPool().seed(characters=5)
+    monkeypatch.setattr(database.Config, "MYSQL_REPLICA_HOSTS", "replica:3306")
+    monkeypatch.setattr(database, "get_pool", lambda: primary)
+    monkeypatch.setattr(database, "replicas", [replica])
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/classes/1", headers=headers).status_code == 200
+    assert (primary.checkouts, replica.checkouts) == (0, 1)
+    created = client.post("/api/classes", json={"name": "Pyromancer", "description": ""}, headers=headers)
+    assert created.status_code == 201 and primary.checkouts == 1
+    assert database.PIN_COOKIE in created.headers["Set-Cookie"]
+    path = f"/api/classes/{created.get_json()['id']}"
+    assert app.test_client().get(path, headers=headers).status_code == 404
+    assert client.get(path, headers=headers).status_code == 200
+    assert (primary.checkouts, replica.checkouts) == (2, 2)
+
+
+def test_multi_get_preserves_order_and_reports_missing(app, monkeypatch):
+    from benchmarks.standin import StandinPool
+
+    pool = StandinPool().seed(characters=10)
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    monkeypatch.setattr(database.Config, "BULK_CHUNK_SIZE", 2)
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    data = client.get("/api/characters?ids=7,2,999,7,4&expand=class", headers=headers).get_json()
+    assert [item["id"] for item in data["characters"]] == [7, 2, 4] and data["missing"] == [999]
+    assert data["characters"][0]["class"]["id"] == data["characters"][0]["class_id"]
+    resp = client.get("/api/classes?ids=3,1,42&format=xml", headers=headers)
+    assert resp.data.startswith(b"<response><classes><item><id>3</id>") and resp.data.endswith(b"<missing><item>42</item></missing></response>")
+    assert client.get("/api/stats?ids=1,x", headers=headers).status_code == 400
+
+
+def test_character_filters_are_grouped_by_access_type():
+    sql, params = query.character_query({"name": "art", "search": "contains", "class_id": 2, "strength_min": 20, "faith_min": 90}, after_id=5)
+    assert sql.endswith(
+        "WHERE c.class_id = %s AND c.id > %s"
+        " AND EXISTS (SELECT 1 FROM stats s WHERE s.id = c.stat_id AND s.strength >= %s AND s.faith >= %s)"
+        " AND c.name LIKE %s"
+    )
+    assert params == [2, 5, 20, 90, "%art%"]
+    sql, _ = query.character_query({"strength_min": 20}, expand=("stats",))
+    assert "EXISTS" not in sql and sql.endswith("JOIN stats s ON c.stat_id = s.id WHERE s.strength >= %s")
+
+
+def test_explain_reports_full_scans(app, fake_pool, monkeypatch):
+    fake_pool.responder = lambda sql, params: [
+        {"id": 1, "select_type": "PRIMARY", "table": "c", "type": "ALL", "key": None, "rows": 1000},
+        {"id": 2, "select_type": "DEPENDENT SUBQUERY", "table": "s", "type": "eq_ref", "key": "PRIMARY", "rows": 1},
+    ]
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/admin/explain?class_id=2", headers=headers).status_code == 404
+    monkeypatch.setattr(database.Config, "EXPLAIN_ENABLED", True)
+    data = client.get("/api/admin/explain?class_id=2&agility_min=50&limit=10", headers=headers).get_json()
+    assert data["full_scans"] == ["c"] and data["params"] == [2, 50, 11]
+    assert fake_pool.connections[-1].executed[-1][0] == "EXPLAIN " + data["query"]
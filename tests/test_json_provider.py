@@ -0,0 +1,30 @@
+import json
+import sys
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import Config
+from app.json_provider import FastJSONProvider, dumps_row
+
+
+def test_native_encoder_matches_stdlib_output(app, monkeypatch):
+    data = {"b": [{"id": 1, "name": "Knight"}], "a": datetime(2024, 1, 1), "c": Decimal("1.5"), "d": None}
+    with app.app_context():
+        fast = app.json.response(data).get_data()
+        monkeypatch.setattr(Config, "JSON_ENCODER", "stdlib")
+        stdlib = FastJSONProvider(app)
+        assert not stdlib.native
+        slow = stdlib.response(data).get_data()
+    assert app.json.native
+    assert fast == slow
+    assert json.loads(fast)["a"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_stream_rows_keep_column_order(monkeypatch):
+    row = {"id": 2, "name": "é", "description": ""}
+    assert json.loads(dumps_row(row)) == row
+    monkeypatch.setattr(Config, "JSON_ENCODER", "stdlib")
+    assert dumps_row(row) == '{"id":2,"name":"\\u00e9","description":""}'
@@ -0,0 +1,105 @@
+import json
+import os
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import Config
+from app import metrics as metrics_module
+from app.metrics import Metrics, metrics, statement_label
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_statement_labels():
+    assert statement_label("SELECT id, name FROM classes WHERE id > %s") == "SELECT classes"
+    assert statement_label("INSERT INTO characters (name) VALUES (%s)") == "INSERT characters"
+    assert statement_label("(SELECT 'stats' AS tbl, id FROM stats WHERE id IN (%s))") == "SELECT stats"
+
+
+def test_histogram_renders_prometheus_text():
+    registry = Metrics()
+    registry.observe("latency_seconds", 0.003, route="/api/x")
+    registry.observe("latency_seconds", 20, route="/api/x")
+    registry.inc("hits_total", 2)
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/api/x",le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{route="/api/x",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/api/x"} 2' in text
+    assert "hits_total 2" in text
+
+
+def test_request_instrumentation(app, fake_pool, enabled):
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": Config.API_USER, "password": Config.API_PASSWORD}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    resp = client.get("/api/classes", headers=headers)
+    timing = resp.headers["Server-Timing"]
+    for phase in ("auth", "pool", "db", "serialize", "total"):
+        assert f"{phase};dur=" in timing
+    text = client.get("/api/metrics", headers=headers).data.decode()
+    assert 'api_request_duration_seconds_count{method="GET",route="/api/classes"} 1' in text
+    assert 'api_query_duration_seconds_count{statement="SELECT classes"} 1' in text
+    assert "api_pool_connections_in_use 0" in text
+    assert 'api_query_duration_seconds_count{statement="SELECT table_versions"} 1' in text
+    assert "api_rows_returned_total 2" in text
+
+
+def test_disabled_metrics_add_no_header(app, fake_pool):
+    client = app.test_client()
+    resp = client.post("/api/login", json={"username": "x", "password": "y"})
+    assert "Server-Timing" not in resp.headers
+
+
+def test_verified_token_cache_honors_expiry_and_blocklist(app, fake_pool, enabled, monkeypatch):
+    from datetime import timedelta
+    import time
+    from flask_jwt_extended import create_access_token
+    from app.auth import token_cache
+
+    monkeypatch.setattr(Config, "JWT_CACHE_ENABLED", True)
+    token_cache.clear()
+    client = app.test_client()
+    with app.app_context():
+        short = create_access_token(identity="svc", expires_delta=timedelta(seconds=1))
+    headers = {"Authorization": f"Bearer {short}"}
+    assert client.get("/api/classes/1", headers=headers).status_code == 200
+    assert client.get("/api/classes/1", headers=headers).status_code == 200
+    text = metrics.render()
+    assert "api_auth_cache_hits_total 1" in text and "api_auth_cache_misses_total 1" in text
+    assert "api_auth_cache_saved_seconds_total" in text
+    time.sleep(1.1)
+    assert client.get("/api/classes/1", headers=headers).status_code == 401
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='svc')}"}
+    assert client.get("/api/classes/1", headers=headers).status_code == 200
+    app.extensions["flask-jwt-extended"].token_in_blocklist_loader(lambda header, payload: True)
+    assert client.get("/api/classes/1", headers=headers).status_code == 401
+    token_cache.clear()
+
+
+def test_scrape_merges_snapshots_exported_by_other_workers(tmp_path, enabled, monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_DIR", str(tmp_path))
+    other, dead = Metrics(), Metrics()
+    for registry in (other, dead):
+        registry.inc("api_requests_total", 3, route="/api/classes")
+        registry.gauge_add("api_pool_connections_in_use", 2)
+        registry.observe("api_request_duration_seconds", 0.003)
+    (tmp_path / f"metrics-{os.getppid()}.json").write_text(json.dumps(other.snapshot()))
+    (tmp_path / "metrics-999999999.json").write_text(json.dumps(dead.snapshot()))
+    metrics.inc("api_requests_total", 1, route="/api/classes")
+    metrics_module.export(force=True)
+    text = metrics_module.collect().render()
+    assert 'api_requests_total{route="/api/classes"} 7' in text
+    assert "api_pool_connections_in_use 2" in text and "api_request_duration_seconds_count 2" in text
+    metrics_module.clear_exports()
+    assert list(tmp_path.iterdir()) == []
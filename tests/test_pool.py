@@ -0,0 +1,177 @@
+import sys
+import threading
+import time
+from pathlib import Path
+import pytest
+from mysql.connector.errors import OperationalError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import database, query
+from app.database import ConnectionPool, PoolTimeout
+
+
+class RawCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        if sql.startswith("KILL QUERY"):
+            self.conn.server.killed.add(int(sql.split()[-1]))
+        else:
+            self.conn.pending = [{"id": i, "name": f"c{i}", "description": ""} for i in range(1, self.conn.server.rows + 1)]
+
+    def fetchmany(self, size=1):
+        batch, self.conn.pending = self.conn.pending[:size], self.conn.pending[size:]
+        self.conn.server.fetched += len(batch)
+        return batch
+
+    def close(self):
+        pass
+
+
+class Server:
+    def __init__(self, rows=0):
+        self.rows = rows
+        self.fetched = 0
+        self.killed = set()
+
+
+class RawConnection:
+    def __init__(self, number, server):
+        self.number = number
+        self.connection_id = number
+        self.server = server
+        self.pending = []
+        self.alive = True
+        self.closed = False
+        self.shut_down = False
+        self.rollbacks = 0
+        self.pings = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.alive:
+            raise OperationalError("MySQL Connection not available")
+
+    def rollback(self):
+        if not self.alive:
+            raise OperationalError("MySQL Connection not available")
+        self.rollbacks += 1
+
+    def cursor(self, dictionary=True, buffered=None):
+        return RawCursor(self)
+
+    def close(self):
+        # Closing mid-result reads the rest of it unless the server was told to stop sending.
+        if self.connection_id not in self.server.killed:
+            self.server.fetched += len(self.pending)
+        self.pending = []
+        self.closed = True
+
+    def shutdown(self):
+        self.shut_down = True
+
+
+class CextConnection(RawConnection):
+    def shutdown(self):
+        raise NotImplementedError
+
+
+def make_pool(connection=RawConnection, server=None, **kwargs):
+    opened = []
+    server = server or Server()
+
+    def connect():
+        opened.append(connection(len(opened) + 1, server))
+        return opened[-1]
+
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_overflow_is_closed_on_release_and_timeout_raises():
+    pool, opened = make_pool(size=1, overflow=1, timeout=0.05)
+    first, second = pool.get_connection(), pool.get_connection()
+    with pytest.raises(PoolTimeout):
+        pool.get_connection()
+    second.close()
+    assert opened[1].closed and opened[1].rollbacks == 1
+    first.close()
+    assert not opened[0].closed
+    stats = pool.stats()
+    assert (stats["total"], stats["idle"], stats["in_use"]) == (1, 1, 0)
+    assert (stats["created"], stats["timeouts"], stats["waits"]) == (2, 1, 1)
+
+
+def test_waiters_are_served_in_order():
+    pool, opened = make_pool(size=1, timeout=2)
+    held = pool.get_connection()
+    served = []
+
+    def worker(name):
+        conn = pool.get_connection()
+        served.append(name)
+        conn.close()
+
+    threads = []
+    for name in ("a", "b", "c"):
+        threads.append(threading.Thread(target=worker, args=(name,)))
+        threads[-1].start()
+        while pool.stats()["waiting"] < len(threads):
+            time.sleep(0.001)
+    held.close()
+    for thread in threads:
+        thread.join()
+    assert served == ["a", "b", "c"]
+    assert len(opened) == 1 and pool.stats()["checkouts"] == 4
+
+
+def test_stale_connections_are_pinged_and_replaced():
+    pool, opened = make_pool(size=2, ping_interval=0)
+    pool.get_connection().close()
+    opened[0].alive = False
+    conn = pool.get_connection()
+    assert conn.number == 2 and opened[0].closed
+    opened[1].alive = False
+    conn.close()
+    stats = pool.stats()
+    assert (stats["reconnects"], stats["discarded"], stats["total"]) == (1, 1, 0)
+    pool.recycle = 0
+    pool.get_connection().close()
+    assert pool.get_connection().number == 4 and pool.stats()["recycled"] == 1
+
+
+def test_discarded_connection_is_shut_down_and_frees_its_slot():
+    pool, opened = make_pool(size=1, timeout=0.05)
+    pool.get_connection().discard()
+    assert opened[0].shut_down and not opened[0].closed and opened[0].rollbacks == 0
+    assert opened[0].server.killed == {1} and opened[1].closed
+    assert pool.get_connection().number == 3
+    stats = pool.stats()
+    assert (stats["discarded"], stats["total"], stats["in_use"]) == (1, 1, 1)
+
+
+def test_abandoned_stream_without_shutdown_is_killed_not_drained(monkeypatch, caplog):
+    server = Server(rows=1000)
+    pool, opened = make_pool(CextConnection, server, size=1)
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    monkeypatch.setattr(database.Config, "STREAM_BATCH_SIZE", 100)
+    rows = query.iter_classes()
+    assert next(rows)["id"] == 1
+    rows.close()
+    assert server.killed == {1} and opened[0].closed
+    assert server.fetched == 100
+    assert "has no shutdown()" in caplog.text
+    assert pool.stats()["discarded"] == 1
+
+
+def test_pool_timeout_returns_503(app, monkeypatch):
+    pool, _ = make_pool(size=1, timeout=0.01)
+    pool.get_connection()
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    resp = client.get("/api/classes/1", headers=headers)
+    assert resp.status_code == 503 and resp.headers["Retry-After"] == "5"
+    assert client.get("/api/pool/stats", headers=headers).get_json()["pool"]["timeouts"] == 1
@@ -0,0 +1,94 @@
+import sqlite3
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import database, response_cache
+from app.response_cache import MemoryStore, SharedStore
+
+
+def entry(body):
+    return 200, [("Content-Type", "application/json")], body
+
+
+def test_shared_store_is_visible_across_handles_and_rejects_stale_puts(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    first, second = SharedStore(path, 100), SharedStore(path, 100)
+    generations = first.generations(("classes",))
+    assert first.put("/api/classes?", ("classes",), generations, entry(b"a" * 40), 60)
+    assert second.get("/api/classes?") == entry(b"a" * 40)
+    stale = second.generations(("weapons", "classes"))
+    first.invalidate(("classes",))
+    assert second.get("/api/classes?") is None
+    assert not second.put("/api/characters?", ("weapons", "classes"), stale, entry(b"b"), 60)
+    for name in "xyz":
+        second.put(f"/api/weapons/{name}?", ("weapons",), second.generations(("weapons",)), entry(b"w" * 40), 60)
+    assert first.get("/api/weapons/x?") is None and first.stats()["entries"] == 2
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryStore(100)
+    for name in "abc":
+        store.put(name, ("stats",), (0,), entry(b"s" * 40), 60)
+    assert store.get("a") is None
+    assert store.stats() == {"entries": 2, "bytes": 80, "maxbytes": 100, "evictions": 1}
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    store = MemoryStore(1 << 20)
+    monkeypatch.setattr(response_cache.Config, "RESPONSE_CACHE", "memory")
+    monkeypatch.setattr(response_cache, "store", store)
+    monkeypatch.setattr(response_cache, "counters", dict.fromkeys(response_cache.counters, 0))
+    return store
+
+
+def test_hot_gets_skip_the_database_until_a_write(app, fake_pool, responses):
+    client = app.test_client()
+    token = client.post("/api/login", json={"username": "admin", "password": "password"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    first = client.get("/api/classes/1?format=xml", headers=headers)
+    assert first.status_code == 200 and fake_pool.checkouts == 1
+    cached = client.get("/api/classes/1?format=xml", headers=headers)
+    assert cached.data == first.data and cached.headers["Content-Type"] == "application/xml"
+    assert client.get("/api/classes/1?format=xml", headers={**headers, "If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert fake_pool.checkouts == 1
+    assert client.post("/api/classes", json={"name": "Mage", "description": ""}, headers=headers).status_code == 201
+    assert client.get("/api/classes/1?format=xml", headers=headers).status_code == 200
+    assert fake_pool.checkouts == 3
+    stats = client.get("/api/cache/stats", headers=headers).get_json()["responses"]
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 1)
+
+
+class LockedStore(MemoryStore):
+    def invalidate(self, tables):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_failed_invalidation_flushes_instead_of_failing_the_write(app, fake_pool, monkeypatch):
+    store = LockedStore(1 << 20)
+    monkeypatch.setattr(response_cache.Config, "RESPONSE_CACHE", "memory")
+    monkeypatch.setattr(response_cache, "store", store)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {client.post('/api/login', json={'username': 'admin', 'password': 'password'}).get_json()['access_token']}"}
+    assert client.get("/api/classes/1", headers=headers).status_code == 200 and store.stats()["entries"] == 1
+    assert client.post("/api/classes", json={"name": "Mage", "description": ""}, headers=headers).status_code == 201
+    assert store.stats()["entries"] == 0 and response_cache.counters["errors"] >= 1
+
+
+def test_misses_are_filled_from_the_primary_when_replicas_lag(app, responses, monkeypatch):
+    from benchmarks.standin import StandinPool
+
+    primary, replica = StandinPool().seed(characters=5), StandinPool().seed(characters=5)
+    monkeypatch.setattr(database.Config, "MYSQL_REPLICA_HOSTS", "replica:3306")
+    monkeypatch.setattr(database, "get_pool", lambda: primary)
+    monkeypatch.setattr(database, "replicas", [replica])
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {client.post('/api/login', json={'username': 'admin', 'password': 'password'}).get_json()['access_token']}"}
+    assert client.get("/api/weapons/1", headers=headers).status_code == 200
+    assert client.get("/api/weapons/1", headers=headers).status_code == 200
+    assert (primary.checkouts, replica.checkouts) == (1, 0) and responses.stats()["entries"] == 1
+    assert client.get("/api/weapons?format=ndjson", headers=headers).status_code == 200
+    assert primary.checkouts == 1 and replica.checkouts > 0
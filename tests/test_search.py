@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import query
+from app.migrations import MIGRATIONS_DIR, split_statements
+from app.search import SEARCH_ENGINES, TrigramSearch
+
+
+def test_like_modes_escape_wildcards():
+    assert SEARCH_ENGINES["contains"].condition("c.name", "50%") == ("c.name LIKE %s", ["%50\\%%"])
+    assert SEARCH_ENGINES["prefix"].condition("c.name", "Art_") == ("c.name LIKE %s", ["Art\\_%"])
+    sql, params = SEARCH_ENGINES["fulltext"].condition("c.name", "dark +souls")
+    assert sql == "MATCH(c.name) AGAINST (%s IN BOOLEAN MODE)"
+    assert params == ["+dark* +souls*"]
+
+
+def test_trigram_index_builds_and_tracks_writes(fake_pool):
+    fake_pool.rows = [{"id": 1, "name": "Artorias"}, {"id": 2, "name": "Lucatiel"}, {"id": 3, "name": "Ornstein"}]
+    engine = TrigramSearch()
+    assert engine.search("tor") is None
+    engine.build()
+    assert engine.search("tor") == [1]
+    assert engine.search("i") is None
+    engine.add(4, "Gwyn Tor")
+    engine.remove(1)
+    assert engine.condition("c.name", "tor") == ("c.id IN (%s)", [4])
+    assert engine.condition("c.name", "zzz") == ("1 = 0", [])
+    assert engine.condition("c.name", "i") == ("c.name LIKE %s", ["%i%"])
+    assert fake_pool.checkouts == 5 and engine.builder is None
+
+
+def test_trigram_index_rebuilds_on_new_version_and_caps_matches(fake_pool, monkeypatch):
+    fake_pool.rows = [{"id": 1, "name": "Artorias"}]
+    engine = TrigramSearch()
+    assert engine.condition("c.name", "tor") == ("c.name LIKE %s", ["%tor%"])
+    engine.builder.join()
+    assert engine.condition("c.name", "tor") == ("c.id IN (%s)", [1])
+    fake_pool.rows = [{"id": 1, "name": "Artorias"}, {"id": 2, "name": "Torch"}]
+    fake_pool.versions["characters"] = 1
+    engine.condition("c.name", "tor")
+    engine.builder.join()
+    assert engine.version == 1 and engine.search("tor") == [1, 2]
+    monkeypatch.setattr(query.Config, "TRIGRAM_MAX_IDS", 1)
+    assert engine.condition("c.name", "tor") == ("c.name LIKE %s", ["%tor%"])
+
+
+def test_character_query_uses_selected_mode():
+    sql, params = query.character_query({"name": "Art", "search": "prefix"})
+    assert "c.name LIKE %s" in sql and params == ["Art%"]
+
+
+def test_migrations_split_into_statements():
+    statements = split_statements((MIGRATIONS_DIR / "001_character_name_search.sql").read_text())
+    assert statements == [
+        "CREATE INDEX idx_characters_name ON characters (name)",
+        "CREATE FULLTEXT INDEX ft_characters_name ON characters (name)",
+    ]
@@ -0,0 +1,22 @@
+import runpy
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import database
+from app.metrics import metrics
+from app.config import Config
+
+
+def test_gunicorn_config_preloads_and_resets_metrics_per_worker(monkeypatch):
+    conf = runpy.run_path(str(Path(__file__).resolve().parents[1] / "gunicorn.conf.py"))
+    assert conf["preload_app"] is True
+    assert conf["wsgi_app"] == "app.app:app"
+    assert conf["workers"] == Config.WEB_WORKERS and conf["threads"] == Config.WEB_THREADS
+    parent_pool = object()
+    monkeypatch.setattr(database, "pool", parent_pool)
+    metrics.inc("api_requests_total")
+    conf["post_fork"](None, None)
+    # The pool itself is reset by os.register_at_fork, not a second time here.
+    assert database.pool is parent_pool and metrics.counters == {}